@@ -8,14 +8,16 @@ App Template for static publishing.
 """
 
 import app_config
-import json
+import data_cache
 import oauth
 import static
 
 from collections import OrderedDict
+from conditional import COPY_PATHS, TEMPLATES_PATH, app_config_version, conditional
 from flask import Flask, make_response, render_template
 from math import ceil
-from render_utils import make_context, smarty_filter, urlencode_filter, format_time_filter
+from render_utils import make_context, smarty_filter, urlencode_filter, format_time_filter, srcset_filter
+from song_index import PATH as SONG_INDEX_PATH, SongIndex
 from werkzeug.debug import DebuggedApplication
 
 app = Flask(__name__)
@@ -24,21 +26,23 @@ app.debug = app_config.DEBUG
 app.add_template_filter(smarty_filter, name='smarty')
 app.add_template_filter(urlencode_filter, name='urlencode')
 app.add_template_filter(format_time_filter, name='format_time')
+app.add_template_filter(srcset_filter, name='srcset')
 
 @app.route('/')
 @oauth.oauth_required
+@conditional(['data/featured.json', 'www/data/songs/index.json', TEMPLATES_PATH] + COPY_PATHS, app_config_version)
 def index():
     """
     Example view demonstrating rendering a simple HTML page.
     """
     context = make_context()
 
-    with open('data/featured.json') as f:
-        context['featured'] = json.load(f)
+    context['featured'] = data_cache.load('data/featured.json')
 
-    with open('data/songs.json') as f:
-        context['song_data'] = f.read()
-        context['total_songs'] = len(json.loads(context['song_data']))
+    # Songs are loaded by tag, see `fab data.update_songs`
+    song_index = data_cache.get('www/data/songs/index.json')
+    context['song_index'] = song_index.raw
+    context['total_songs'] = song_index.derive('total_songs', lambda entry: entry.data['all']['count'])
 
     tags = context['COPY']['tags']._serialize()
     for key, tag in tags.items():
@@ -50,48 +54,80 @@ def index():
     return make_response(render_template('index.html', **context))
 
 @app.route('/covers.html')
+@conditional([SONG_INDEX_PATH, 'data/covers.json', TEMPLATES_PATH] + COPY_PATHS, app_config_version)
 def covers():
     """
     Preview for Seamus page
     """
     context = make_context()
 
-    # Read the songs JSON into the page.
-    with open('data/songs.json', 'rb') as readfile:
-        songs_data = json.load(readfile)
-        songs = sorted(songs_data, key=lambda k: (k['artist'].lower()[4:] if k['artist'].lower().startswith('the ') else k['artist'].lower()))
+    # Resized derivatives, see `fab data.process_album_art`
+    try:
+        context['covers'] = data_cache.load('data/covers.json')
+    except OSError:
+        context['covers'] = {}
 
-    context['songs'] = songs
+    context['songs'] = _sorted_songs()
     return make_response(render_template('covers.html', **context))
 
 @app.route('/seamus.html')
+@conditional([SONG_INDEX_PATH, TEMPLATES_PATH] + COPY_PATHS, app_config_version)
 def seamus():
     """
     Preview for Seamus page
     """
     context = make_context()
 
-    # Read the songs JSON into the page.
-    with open('data/songs.json', 'rb') as readfile:
-        songs_data = json.load(readfile)
-        songs = sorted(songs_data, key=lambda k: (k['artist'].lower()[4:] if k['artist'].lower().startswith('the ') else k['artist'].lower()))
-
-    tags = context['COPY']['tags']._serialize() #.values(), key=lambda k: k['displayname'])
-    context['songs'] = _group_by_genre(songs, tags)
+    tags = context['COPY']['tags']._serialize()
+    context['songs'] = _songs_by_genre(tags)
     context['tags'] = tags
 
     return make_response(render_template('seamus-preview.html', **context))
 
+def _artist_sort_key(artist):
+    """
+    Sort artists ignoring case and a leading "The".
+    """
+    artist = (artist or u'').lower()
+
+    if artist.startswith('the '):
+        return artist[4:]
+
+    return artist
+
+def _sort_songs(entry):
+    index = SongIndex(entry.path)
+    keys = [_artist_sort_key(artist) for artist in index.column('artist')]
+
+    return [index[i] for i in sorted(range(len(index)), key=keys.__getitem__)]
+
+def _sorted_songs():
+    """
+    Songs from the song index sorted by artist, see `fab data.update_songs`.
+    Sorted once per version of the index.
+    """
+    return data_cache.get(SONG_INDEX_PATH).derive('sorted_songs', _sort_songs)
+
+def _songs_by_genre(tags):
+    """
+    Sorted songs grouped by tag. Grouped once per version of the index
+    and set of tags.
+    """
+    entry = data_cache.get(SONG_INDEX_PATH)
+
+    return entry.derive(('songs_by_genre',) + tuple(tags), lambda entry: _group_by_genre(entry.derive('sorted_songs', _sort_songs), tags))
 
 def _group_by_genre(songs, tags):
-    grouped = OrderedDict()
-    for key, tag in tags.items():
-        #import ipdb; ipdb.set_trace();
-        grouped[key] = []
+    """
+    Group songs under each of their tags, keeping song order. Tags not in
+    `tags` are ignored.
+    """
+    grouped = OrderedDict((key, []) for key in tags)
+
     for song in songs:
-        print 'grouping %s' % song['id']
-        tag = song['genre_tags'][0]
-        grouped[tag].append(song)
+        for tag in song['genre_tags']:
+            if tag in grouped:
+                grouped[tag].append(song)
 
     return grouped
 
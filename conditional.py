@@ -0,0 +1,128 @@
+#!/usr/bin/env python
+
+"""
+Conditional GET for views.
+
+A view declares the files and directories its response is built from.
+Their mtimes and sizes give a strong ETag and a Last-Modified date, so a
+client revalidating an unchanged page gets a 304 without the page being
+rendered again.
+"""
+
+import hashlib
+import json
+import os
+
+from datetime import datetime
+from functools import wraps
+from flask import make_response
+
+import app_config
+import copy_cache
+
+from render_utils import BetterJSONEncoder, flatten_app_config
+
+TEMPLATES_PATH = 'templates'
+
+# The workbook and its snapshot, see `copy_cache`
+COPY_PATHS = [app_config.COPY_PATH] + list(copy_cache.snapshot_paths(app_config.COPY_PATH))
+
+def app_config_version():
+    """
+    The configuration views render with, which changes with the target.
+    """
+    return json.dumps(flatten_app_config(), cls=BetterJSONEncoder, sort_keys=True)
+
+def _stat_paths(paths):
+    """
+    Get (path, mtime, size) of each file in `paths`, walking directories.
+    Missing files are included with no mtime or size.
+    """
+    stats = []
+
+    for path in paths:
+        if os.path.isdir(path):
+            for root, dirs, filenames in os.walk(path):
+                dirs.sort()
+
+                for filename in sorted(filenames):
+                    filename = os.path.join(root, filename)
+                    stat = os.stat(filename)
+                    stats.append((filename, stat.st_mtime, stat.st_size))
+        else:
+            try:
+                stat = os.stat(path)
+            except OSError:
+                stats.append((path, None, None))
+            else:
+                stats.append((path, stat.st_mtime, stat.st_size))
+
+    return stats
+
+def get_validators(name, paths, extra=''):
+    """
+    Get the ETag and Last-Modified date of a response named `name` built
+    from `paths` and the string `extra`.
+    """
+    stats = _stat_paths(paths)
+
+    etag = hashlib.md5(repr((name, stats)))
+    etag.update(extra)
+
+    mtimes = [mtime for path, mtime, size in stats if mtime is not None]
+
+    if mtimes:
+        last_modified = datetime.utcfromtimestamp(int(max(mtimes)))
+    else:
+        last_modified = None
+
+    return etag.hexdigest(), last_modified
+
+def is_not_modified(etag, last_modified):
+    """
+    Check whether the request's validators match. If-None-Match takes
+    precedence over If-Modified-Since.
+    """
+    # Imported here so no request proxy is a module global, which breaks
+    # Fabric's task discovery
+    from flask import request
+
+    if request.if_none_match:
+        return request.if_none_match.contains(etag)
+
+    if request.if_modified_since and last_modified:
+        return last_modified <= request.if_modified_since
+
+    return False
+
+def conditional(paths, extra=None):
+    """
+    Decorate a view whose response only depends on `paths` and the string
+    returned by `extra()`. `paths` may also be a function of the view's
+    arguments returning them. Matching requests get a 304 without
+    calling the view.
+    """
+    def decorator(f):
+        @wraps(f)
+        def decorated_function(*args, **kwargs):
+            view_paths = paths(*args, **kwargs) if callable(paths) else paths
+            etag, last_modified = get_validators(f.__name__, view_paths, extra() if extra else '')
+
+            if is_not_modified(etag, last_modified):
+                response = make_response('', 304)
+            else:
+                response = make_response(f(*args, **kwargs))
+
+                if response.status_code != 200:
+                    return response
+
+            response.set_etag(etag)
+
+            if last_modified:
+                response.last_modified = last_modified
+
+            return response
+
+        return decorated_function
+
+    return decorator
@@ -0,0 +1,211 @@
+#!/usr/bin/env python
+
+"""
+A Copy of the copy spreadsheet shared by every request in a process.
+
+Parsing copy.xlsx is the slowest part of rendering a page, so the
+workbook is parsed once and reused until its mtime or size changes, see
+`data_cache`. Loads are timed so the cost stays visible.
+
+`fab text.update` also compiles the workbook into a snapshot: its sheets
+as JSON (copy.json) and the exact copy.js payload (copy.js), next to
+copy.xlsx. While the snapshot matches the workbook it is read instead,
+and the workbook is only parsed when the snapshot is missing or stale.
+"""
+
+import json
+import os
+import tempfile
+import threading
+import time
+
+from collections import OrderedDict
+
+import app_config
+import copytext
+import data_cache
+
+class _Stats(object):
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.clear()
+
+    def clear(self):
+        self.requests = 0
+        self.loads = 0
+        self.load_seconds = 0.0
+        self.last_load_seconds = None
+
+_stats = _Stats()
+
+SNAPSHOT_VERSION = 1
+
+class SnapshotCopy(copytext.Copy):
+    """
+    A Copy read from a snapshot instead of a workbook.
+    """
+    def __init__(self, snapshot, filename):
+        self._snapshot = snapshot
+        copytext.Copy.__init__(self, filename)
+
+    def load(self):
+        for name, columns, rows in self._snapshot['sheets']:
+            self._copy[name] = copytext.Sheet(name, [dict(zip(columns, row)) for row in rows], columns)
+
+def snapshot_paths(path=app_config.COPY_PATH):
+    """
+    Get the paths of the JSON snapshot and copy.js payload of a workbook.
+    """
+    base = os.path.splitext(path)[0]
+
+    return '%s.json' % base, '%s.js' % base
+
+def _source(path):
+    stat = os.stat(path)
+
+    return [stat.st_mtime, stat.st_size]
+
+def write_snapshot(path=app_config.COPY_PATH):
+    """
+    Compile a workbook into its snapshot. The snapshot records the
+    workbook's mtime and size, so it is ignored once the workbook changes.
+    """
+    copy = copytext.Copy(path)
+
+    # Rows keep every column, so the snapshot rebuilds the same sheets
+    sheets = []
+
+    for name, sheet in copy._copy.items():
+        sheets.append([name, sheet._columns, [list(row) for row in sheet]])
+
+    snapshot = OrderedDict([
+        ('version', SNAPSHOT_VERSION),
+        ('source', _source(path)),
+        ('sheets', sheets)
+    ])
+
+    snapshot_path, js_path = snapshot_paths(path)
+
+    # The payload is written first, as the snapshot marks both as fresh
+    _write(js_path, 'window.COPY = ' + copy.json())
+    _write(snapshot_path, json.dumps(snapshot, separators=(',', ':')))
+
+def _write(path, data):
+    fd, temp_path = tempfile.mkstemp(dir=os.path.dirname(path) or '.', suffix='.tmp')
+
+    try:
+        with os.fdopen(fd, 'w') as f:
+            f.write(data)
+
+        # mkstemp creates files only the owner can read
+        os.chmod(temp_path, 0644)
+        os.rename(temp_path, path)
+    except:
+        os.remove(temp_path)
+        raise
+
+def _snapshot_entry(path):
+    """
+    Get the cache entry of a workbook's snapshot, or None if it is missing,
+    stale or from another version.
+    """
+    snapshot_path = snapshot_paths(path)[0]
+
+    try:
+        entry = data_cache.get(snapshot_path)
+    except OSError:
+        return None
+
+    try:
+        source = _source(path)
+    except OSError:
+        # Deployed without the workbook
+        source = None
+
+    snapshot = entry.data
+
+    if snapshot.get('version') != SNAPSHOT_VERSION:
+        return None
+
+    if source is not None and snapshot['source'] != source:
+        return None
+
+    return entry
+
+def _load(entry, path=None):
+    start = time.time()
+
+    if path is None:
+        copy = copytext.Copy(entry.path)
+    else:
+        copy = SnapshotCopy(entry.data, path)
+
+    elapsed = time.time() - start
+
+    with _stats.lock:
+        _stats.loads += 1
+        _stats.load_seconds += elapsed
+        _stats.last_load_seconds = elapsed
+
+    return copy
+
+def _entry(path):
+    try:
+        return data_cache.get(path)
+    except OSError:
+        raise copytext.CopyException('"%s" does not exist. Have you run "fab update_copy"?' % path)
+
+def get_copy(path=app_config.COPY_PATH):
+    """
+    Get the Copy for the current version of a workbook. Raises
+    copytext.CopyException if it does not exist.
+    """
+    with _stats.lock:
+        _stats.requests += 1
+
+    snapshot = _snapshot_entry(path)
+
+    if snapshot is not None:
+        return snapshot.derive('copy', lambda entry: _load(entry, path))
+
+    return _entry(path).derive('copy', _load)
+
+def get_copy_js(path=app_config.COPY_PATH):
+    """
+    Get the copy.js payload of a workbook, `window.COPY = ...`.
+    """
+    snapshot = _snapshot_entry(path)
+
+    if snapshot is not None:
+        try:
+            return data_cache.get(snapshot_paths(path)[1]).raw
+        except OSError:
+            return snapshot.derive('js', lambda entry: 'window.COPY = ' + get_copy(path).json())
+
+    return _entry(path).derive('js', lambda entry: 'window.COPY = ' + get_copy(path).json())
+
+def stats():
+    """
+    Hit and load counts and load times.
+    """
+    return {
+        'hits': _stats.requests - _stats.loads,
+        'loads': _stats.loads,
+        'load_seconds': _stats.load_seconds,
+        'last_load_seconds': _stats.last_load_seconds
+    }
+
+def print_stats():
+    """
+    Print a line of the hit and load counts.
+    """
+    counts = stats()
+
+    print 'Copy cache: %i hits, %i loads in %.3fs' % (counts['hits'], counts['loads'], counts['load_seconds'])
+
+def clear():
+    """
+    Reset the counters. Cached workbooks are dropped with `data_cache.clear`.
+    """
+    with _stats.lock:
+        _stats.clear()
@@ -0,0 +1,88 @@
+#!/usr/bin/env python
+
+"""
+Data files loaded once per process.
+
+Views read the same few files on every request. Each file is read and
+parsed once and kept until its mtime or size changes, so a data update
+is picked up by the next request without restarting the server. Values
+derived from a file, such as counts or sorted lists, are cached with it.
+"""
+
+import json
+import os
+import threading
+
+class Entry(object):
+    """
+    The cached contents of one version of a file. The raw string, the
+    parsed data and any derived values are computed on first use.
+    """
+    def __init__(self, path, key):
+        self.path = path
+        self.key = key
+        self._values = {}
+        self._lock = threading.RLock()
+
+    def derive(self, name, compute):
+        """
+        Return the value named `name`, calling `compute(entry)` the first
+        time it is asked for.
+        """
+        try:
+            return self._values[name]
+        except KeyError:
+            pass
+
+        with self._lock:
+            if name not in self._values:
+                self._values[name] = compute(self)
+
+        return self._values[name]
+
+    @property
+    def raw(self):
+        return self.derive('raw', _read)
+
+    @property
+    def data(self):
+        return self.derive('data', lambda entry: json.loads(entry.raw))
+
+def _read(entry):
+    with open(entry.path) as f:
+        return f.read()
+
+_entries = {}
+_lock = threading.Lock()
+
+def get(path):
+    """
+    Get the cache entry for the current version of a file. Raises
+    OSError if the file does not exist.
+    """
+    stat = os.stat(path)
+    key = (stat.st_mtime, stat.st_size)
+
+    entry = _entries.get(path)
+
+    if entry is None or entry.key != key:
+        with _lock:
+            entry = _entries.get(path)
+
+            if entry is None or entry.key != key:
+                entry = _entries[path] = Entry(path, key)
+
+    return entry
+
+def load(path):
+    """
+    Get the parsed JSON of a file.
+    """
+    return get(path).data
+
+def clear():
+    """
+    Forget every cached file.
+    """
+    with _lock:
+        _entries.clear()
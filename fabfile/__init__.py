@@ -13,12 +13,14 @@ import app_config
 
 # Other fabfiles
 import assets
+import benchmarks
 import data
 import flat
 import issues
 import render
 import text
 import utils
+import verify
 
 if app_config.DEPLOY_TO_SERVERS:
     import servers
@@ -0,0 +1,264 @@
+#!/usr/bin/env python
+
+"""
+Benchmarks for the data pipeline, run against synthetic data.
+"""
+
+import json
+import os
+import random
+import shutil
+import tempfile
+import sys
+import time
+
+from cStringIO import StringIO
+from fabric.api import task
+
+import data
+import schema
+import social
+import song_index as song_index_module
+
+SIZES = [1000, 10000, 100000]
+
+# Runs per timing in benchmarks that report the best run
+REPEATS = 5
+GENRE_TAGS = ['rock', 'pop', 'country', 'hip-hop', 'electronic', 'jazz', 'folk', 'soul']
+
+def _time(f, *args, **kwargs):
+    """
+    Call a function with stdout silenced, returning its result and run time.
+    """
+    stdout = sys.stdout
+    sys.stdout = StringIO()
+
+    try:
+        start = time.time()
+        result = f(*args, **kwargs)
+        elapsed = time.time() - start
+    finally:
+        sys.stdout = stdout
+
+    return result, elapsed
+
+def _best_time(f, repeats=None):
+    """
+    Call a function `repeats` times, returning its last result and its
+    fastest run time.
+    """
+    timings = []
+
+    for i in range(repeats or REPEATS):
+        result, elapsed = _time(f)
+        timings.append(elapsed)
+
+    return result, min(timings)
+
+def _print_scaling(name, timings):
+    """
+    Print timings per size along with cost per item.
+    """
+    print name
+
+    for size, elapsed in timings:
+        print '%8i items  %8.3fs  %7.2fus/item' % (size, elapsed, elapsed / size * 1000000)
+
+def _synthetic_songs(size, seed=0):
+    """
+    Generate song and review rows shaped like the songs spreadsheet.
+    About one in fifty songs duplicates another's title and audio.
+    """
+    rand = random.Random(seed)
+    songs = []
+    reviews = []
+
+    for i in range(size):
+        song_id = 'song-%i' % i
+        duplicate_of = rand.randrange(i) if i and rand.random() < 0.02 else i
+
+        songs.append({
+            'id': song_id,
+            'artist': ' Artist %i ' % rand.randrange(size),
+            'title': 'Song "%i"' % duplicate_of,
+            'featured': rand.choice(['True', 'False']),
+            'explicit': rand.choice(['True', 'False']),
+            'genre_tags': ', '.join(rand.sample(GENRE_TAGS + ['not-a-tag'], 2)),
+            'media_url': '/%i/song-%i' % (duplicate_of, duplicate_of)
+        })
+
+        for j in range(rand.randrange(4)):
+            reviews.append({
+                'id': song_id,
+                'reviewer': 'Reviewer %i' % j,
+                'review': 'It\'s a "great" song -- really.' if j else ''
+            })
+
+    rand.shuffle(reviews)
+
+    return songs, reviews
+
+def _reference_join(songs, reviews):
+    """
+    The original nested-loop review join, used to check output.
+    """
+    joined = []
+
+    for song in songs:
+        joined.append([review['reviewer'] for review in reviews if review['id'] == song['id'].strip() and review['review']])
+
+    return joined
+
+@task
+def process_songs():
+    """
+    Time the song/review join and validation at several sizes.
+    """
+    timings = []
+
+    for size in SIZES:
+        songs, reviews = _synthetic_songs(size)
+
+        if size == SIZES[0]:
+            expected = _reference_join(songs, reviews)
+
+        (output, hashes, report), elapsed = _time(data._process_rows, enumerate(songs, schema.FIRST_ROW), enumerate(reviews, schema.FIRST_ROW), GENRE_TAGS, False)
+
+        if size == SIZES[0]:
+            joined = [[review['reviewer'] for review in song['reviews']] for song in output]
+            assert joined == expected, 'Review join differs from the nested-loop join'
+
+        assert len(output) == size
+
+        timings.append((size, elapsed))
+
+    _print_scaling('process_songs', timings)
+
+@task
+def validate_songs():
+    """
+    Time schema validation alone at several sizes.
+    """
+    timings = []
+
+    for size in SIZES:
+        songs, reviews = _synthetic_songs(size)
+
+        def validate():
+            report = schema.ValidationReport()
+            validate_song = schema.compile_schema(schema.SONG_SCHEMA, 'songs', { 'genre_tags': set(GENRE_TAGS) })
+            validate_review = schema.compile_schema(schema.REVIEW_SCHEMA, 'reviews')
+
+            validate_review(list(enumerate(reviews, schema.FIRST_ROW)), report)
+            validate_song(list(enumerate(songs, schema.FIRST_ROW)), report)
+
+            return report
+
+        report, elapsed = _time(validate)
+
+        # One in fifty songs is a duplicate and every song has one bad tag in nine
+        assert report.warnings
+
+        timings.append((size, elapsed))
+
+    _print_scaling('validate_songs', timings)
+
+def _synthetic_tweets(size, seed=0):
+    """
+    Generate tweets with a photo, a link and several hashtags, some of
+    which are prefixes of others.
+    """
+    rand = random.Random(seed)
+    tweets = []
+
+    for i in range(size):
+        words = ['Song', 'number', str(i)]
+        entities = { 'hashtags': [], 'urls': [], 'media': [] }
+
+        for tag in rand.sample(GENRE_TAGS + ['rocknroll', 'popular'], 4):
+            start = len(' '.join(words)) + 1
+            words.append('#%s' % tag)
+            entities['hashtags'].append({ 'text': tag, 'indices': [start, start + len(tag) + 1] })
+
+        for key, url in (('urls', 'http://t.co/%i' % i), ('media', 'http://t.co/p%i' % i)):
+            start = len(' '.join(words)) + 1
+            words.append(url)
+            entities[key].append({ 'url': url, 'display_url': 'n.pr/%i' % i, 'media_url': url, 'type': 'photo', 'indices': [start, start + len(url)] })
+
+        tweets.append({ 'text': u' '.join(words), 'entities': entities })
+
+    return tweets
+
+@task
+def link_tweet_entities(size='10000'):
+    """
+    Time linking entities in synthetic tweets.
+    """
+    tweets = _synthetic_tweets(int(size))
+
+    def link_all():
+        return [social.link_tweet_entities(tweet, 'http://twitter.com/nprmusic/status/123') for tweet in tweets]
+
+    output, elapsed = _time(link_all)
+
+    assert all(html.count('<a ') == 6 for html in output)
+
+    _print_scaling('link_tweet_entities', [(len(tweets), elapsed)])
+
+@task
+def song_index():
+    """
+    Compare loading songs.json with loading the columnar song index.
+
+    Opening the index, sorting it by artist as the server does and
+    reading every field of every song are timed separately, each as the
+    best of REPEATS runs so the first run's cold caches don't count.
+    """
+    path = tempfile.mkdtemp()
+
+    def sort_key(artist):
+        artist = artist.lower()
+
+        return artist[4:] if artist.startswith('the ') else artist
+
+    try:
+        for size in SIZES:
+            songs, reviews = _synthetic_songs(size)
+            (output, hashes, report), elapsed = _time(data._process_rows, enumerate(songs, schema.FIRST_ROW), enumerate(reviews, schema.FIRST_ROW), GENRE_TAGS, False)
+
+            json_path = os.path.join(path, 'songs.json')
+            index_path = os.path.join(path, 'songs.idx')
+
+            with open(json_path, 'w') as f:
+                json.dump(output, f)
+
+            song_index_module.write_index(output, index_path)
+
+            def load_json():
+                with open(json_path) as f:
+                    return json.load(f)
+
+            def open_index():
+                index = song_index_module.SongIndex(index_path)
+                index.close()
+
+            loaded, load_elapsed = _best_time(load_json)
+            from_json, json_sort_elapsed = _best_time(lambda: sorted(loaded, key=lambda song: sort_key(song['artist'])))
+            open_elapsed = _best_time(open_index)[1]
+
+            # A fresh index each run, so decoded strings aren't reused
+            def sort_index():
+                fresh = song_index_module.SongIndex(index_path)
+                keys = [sort_key(artist) for artist in fresh.column('artist')]
+
+                return [fresh[i] for i in sorted(range(len(fresh)), key=keys.__getitem__)]
+
+            from_index, index_sort_elapsed = _best_time(sort_index)
+            read_elapsed = _best_time(lambda: [record.to_dict() for record in from_index])[1]
+
+            assert [song['id'] for song in from_json] == [song['id'] for song in from_index]
+
+            print '%8i songs  json %10i bytes  load %8.3fs  sort %8.3fs' % (size, os.path.getsize(json_path), load_elapsed, json_sort_elapsed)
+            print '%8s        index %9i bytes  open %8.3fs  sort %8.3fs  read all %8.3fs' % ('', os.path.getsize(index_path), open_elapsed, index_sort_elapsed, read_elapsed)
+    finally:
+        shutil.rmtree(path)
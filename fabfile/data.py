@@ -5,131 +5,292 @@ Commands that update or process the application data.
 """
 import app_config
 import codecs
+import copy_cache
 import copytext
 import csv
+import hashlib
 import json
 import locale
 import os
 import requests
+import song_index
+import spotify
 import spotipy
 import sys
+import typography
 
-from collections import OrderedDict
+from collections import defaultdict, OrderedDict
 from datetime import datetime
-from fabric.api import task
-from facebook import GraphAPI
+from fabric.api import abort, task
+from images import COVERS_MANIFEST_PATH, COVERS_PATH, COVERS_SRC_PATH, describe_source, merge_entry, render_derivatives, stale_derivatives, supported_derivatives
+from lengths import aggregate_lengths, write_reports
+from mp3 import probe_mp3_length
+from mp3cache import Mp3Cache, MAX_BYTES as MP3_CACHE_MAX_BYTES
+from multiprocessing import Pool
+from multiprocessing.pool import AsyncResult, ThreadPool
 from mutagen.mp3 import MP3, HeaderNotFoundError
 from oauth import get_document
 from rdioapi import Rdio
+from schema import REPORT_PATH as VALIDATION_REPORT_PATH, REVIEW_SCHEMA, SONG_SCHEMA, ValidationReport, compile_schema
+from shards import write_shards
 from shutil import copyfile
-from smartypants import smartypants
-from twitter import Twitter, OAuth
-from utils import confirm_bool
-from PIL import Image
+from social import SocialClient, fetch_featured, link_tweet_entities
+from twitter import OAuth
+from utils import confirm_bool, get_session, write_json
+from verify import verify_links
+from workbook import iter_rows
 
 sys.stdout = codecs.getwriter(locale.getpreferredencoding())(sys.stdout)
 
 SONGS_SPREADSHEET_URL_TEMPLATE = 'https://docs.google.com/feeds/download/spreadsheets/Export?exportFormat=csv&key=%s'
+SONGS_MANIFEST_PATH = 'data/songs-manifest.json'
+SONGS_CHANGES_PATH = 'data/songs-changes.json'
+ALBUM_ART_REPORT_PATH = 'data/album-art-report.json'
 
 @task(default=True)
-def update(verify='true'):
+def update(verify='true', incremental='false', strict='false'):
     """
     Stub function for updating app-specific data.
     """
     #update_featured_social()
-    update_songs(verify)
+    update_songs(verify, incremental, strict)
 
 @task
-def update_songs(verify='true'):
+def update_songs(verify='true', incremental='false', strict='false'):
+    """
+    Download the songs spreadsheet and write data/songs.json, along with
+    its columnar index for the server and a shard of songs per tag in
+    www/data/songs.
+
+    With incremental=true, rows whose content hash matches the manifest
+    from the previous run are reused from the existing songs.json.
+
+    Problems with the rows are written to data/songs-validation.json. With
+    strict=true, any errors abort the update before anything is written.
+    """
     get_document(app_config.SONGS_GOOGLE_DOC_KEY, app_config.SONGS_DATA_PATH)
-    data = copytext.Copy(app_config.SONGS_DATA_PATH)
 
-    output = process_songs(data, verify == 'true')
+    manifest = _read_manifest()
+    previous = None
 
-    with codecs.open('data/songs.json', 'w', 'utf-8') as f:
-        json.dump(output, f)
+    if incremental == 'true':
+        previous = _read_previous_songs(manifest)
+
+    output, hashes, report = process_songs(app_config.SONGS_DATA_PATH, verify == 'true', previous)
+
+    report.write()
+    report.print_summary()
+
+    if strict == 'true' and report.errors:
+        abort('%i errors in the songs spreadsheet, see %s' % (len(report.errors), VALIDATION_REPORT_PATH))
+
+    write_json('data/songs.json', output)
+    song_index.write_index(output)
+    write_shards(output, copy_cache.get_copy()['tags']._serialize())
+
+    _write_manifest(manifest, hashes)
+
+    typography.print_stats()
 
 @task
-def process_songs(data, verify):
+def process_songs(path, verify, previous=None):
+    """
+    Normalize the song rows of the spreadsheet at `path` and join their
+    reviews. Rows are streamed from the workbook rather than loaded at
+    once.
 
-    tagdata = copytext.Copy(app_config.COPY_PATH)['tags']._serialize()
-    genre_tags = tagdata.keys()
+    `previous` maps row keys to their row hash and processed output from
+    an earlier run, see `_row_keys`. Rows whose hash still matches are
+    reused as is.
+
+    Returns the processed songs, an OrderedDict of row hashes by row key
+    and a schema.ValidationReport.
+    """
+    tagdata = copy_cache.get_copy()['tags']._serialize()
+
+    songs = iter_rows(path, 'songs')
+    reviews = iter_rows(path, 'reviews')
+
+    return _process_rows(songs, reviews, tagdata.keys(), verify, previous)
+
+def _process_rows(songs, reviews, genre_tags, verify, previous=None):
+    """
+    Process song and review rows. Both are iterables of spreadsheet row
+    numbers and row dicts, and are only iterated once. Rows are read and
+    validated a sheet at a time, then processed. See `process_songs`.
+    """
+    genre_tags = set(genre_tags)
+
+    report = ValidationReport()
+    validate_song = compile_schema(SONG_SCHEMA, 'songs', { 'genre_tags': genre_tags })
+    validate_review = compile_schema(REVIEW_SCHEMA, 'reviews')
+
+    if verify:
+        covers = set(os.listdir(COVERS_PATH)) if os.path.isdir(COVERS_PATH) else set()
+
+    # Tag changes affect every row, so they are part of each row's hash
+    salt = hashlib.sha1(json.dumps(sorted(genre_tags))).hexdigest()
 
     output = []
-    unique_audio = []
-    unique_song_art = []
-    unique_song_title = []
+    changed = []
+    hashes = OrderedDict()
 
-    songs = data['songs']._serialize()
-    reviews = data['reviews']._serialize()
+    reviews = list(reviews)
+    validate_review(reviews, report)
 
-    for song in songs:
+    reviews_by_id = defaultdict(list)
+    for row_number, review in reviews:
+        reviews_by_id[review['id']].append(review)
+
+    songs = list(songs)
+
+    for row_number, song in songs:
         for name, value in song.items():
             try:
                 song[name] = value.strip()
             except AttributeError:
                 pass
 
-        print '%s - %s' % (song['artist'], song['title'])
+    validate_song(songs, report)
+    song_ids = set(song['id'] for row_number, song in songs)
+    keys = _row_keys(song['id'] for row_number, song in songs)
+
+    for key, (row_number, song) in zip(keys, songs):
+        if verify and '%s.jpg' % song['id'] not in covers:
+            report.add('warning', 'songs', row_number, 'id', 'The song art does not exist: %s/%s.jpg' % (COVERS_PATH, song['id']), song['id'])
 
-        if song['title']:
-            song['title'] = smartypants(song['title'])
+        song_reviews = reviews_by_id.get(song['id'], [])
 
-        if song['artist']:
-            song['artist'] = smartypants(song['artist'])
+        row_hash = _hash_row(song, song_reviews, salt)
+        hashes[key] = row_hash
 
-        if song['featured'] == 'True':
-            song['featured'] = True
+        if previous and key in previous and previous[key]['hash'] == row_hash:
+            song = previous[key]['song']
         else:
-            song['featured'] = False
+            _process_song(song, song_reviews, genre_tags)
+            changed.append(song)
+
+        output.append(song)
 
-        tags = []
+    if previous is not None:
+        print '%i of %i songs changed' % (len(changed), len(output))
 
-        for tag in song['genre_tags'].split(','):
-            tag = tag.strip()
-            if tag in genre_tags:
-                tags.append(tag)
-            elif verify:
-                print "--> Tag %s is not a valid tag" % (tag)
+    # Reviews are checked against every song's id
+    for row_number, review in reviews:
+        id = review['id']
 
-        song['genre_tags'] = tags
+        if id and id not in song_ids:
+            report.add('warning', 'reviews', row_number, 'id', '%s is not a valid id' % id, id)
 
-        song['reviews'] = []
-        for review in reviews:
-            if song['id'] == review['id']:
-                if review['review']:
-                    review['review'] = smartypants(review['review'])
-                    song['reviews'].append(review)
+    if verify and changed:
+        verify_links(changed)
 
-        if verify:
-            # Verify links
-            try:
-                audio_link = 'http://pd.npr.org/anon.npr-mp3%s.mp3' % song['media_url']
-                audio_request = requests.head(audio_link)
+    return output, hashes, report
+
+def _process_song(song, reviews, genre_tags):
+    """
+    Typeset, tag and join reviews onto a single stripped song row.
+    """
+    print '%s - %s' % (song['artist'], song['title'])
 
-                if audio_request.status_code != 200:
-                    print '--> %s The audio URL is invalid: %s' % (audio_request.status_code, audio_link)
-            except:
-                print '--> request.head failed'
+    if song['title']:
+        song['title'] = typography.smartypants(song['title'])
 
-            song_art_path = 'www/assets/covers/%s.jpg' % song['id']
-            if not os.path.isfile(song_art_path):
-                print '--> The song art does not exist: %s' % song_art_path
+    if song['artist']:
+        song['artist'] = typography.smartypants(song['artist'])
 
-            if song['media_url'] in unique_audio:
-                print '--> Duplicate audio url: %s' % song['media_url']
-            else:
-                unique_audio.append(song['media_url'])
+    if song['featured'] == 'True':
+        song['featured'] = True
+    else:
+        song['featured'] = False
 
-            if song['title'] in unique_song_title:
-                print '--> Duplicate title: %s' % song['title']
-            else:
-                unique_song_title.append(song['title'])
+    tags = []
 
-        output.append(song)
+    for tag in song['genre_tags'].split(','):
+        tag = tag.strip()
+        if tag in genre_tags:
+            tags.append(tag)
+
+    song['genre_tags'] = tags
+
+    song['reviews'] = []
+    for review in reviews:
+        if review['review']:
+            review['review'] = typography.smartypants(review['review'])
+            song['reviews'].append(review)
+
+def _row_keys(ids):
+    """
+    Key rows by song id. Repeats of an id are keyed by their occurrence,
+    `id#2` and so on, so duplicate rows keep hashes of their own rather
+    than replacing each other in the manifest.
+    """
+    seen = defaultdict(int)
+    keys = []
+
+    for id in ids:
+        seen[id] += 1
+        keys.append(id if seen[id] == 1 else '%s#%i' % (id, seen[id]))
+
+    return keys
+
+def _hash_row(song, reviews, salt):
+    """
+    Hash a stripped song row and its raw reviews.
+    """
+    row = json.dumps([salt, song, reviews], sort_keys=True)
+
+    return hashlib.sha1(row).hexdigest()
+
+def _read_manifest():
+    """
+    Read the row hashes saved by the last update_songs run.
+    """
+    if not os.path.isfile(SONGS_MANIFEST_PATH):
+        return OrderedDict()
 
-    return output
+    with open(SONGS_MANIFEST_PATH) as f:
+        return json.load(f, object_pairs_hook=OrderedDict)
 
+def _read_previous_songs(manifest):
+    """
+    Pair the songs in data/songs.json with their manifest hashes, keyed
+    like the manifest.
+    """
+    if not manifest or not os.path.isfile('data/songs.json'):
+        return {}
+
+    with open('data/songs.json') as f:
+        songs = json.load(f)
+
+    previous = {}
+
+    for key, song in zip(_row_keys(song['id'] for song in songs), songs):
+        if key in manifest:
+            previous[key] = {
+                'hash': manifest[key],
+                'song': song
+            }
+
+    return previous
+
+def _write_manifest(manifest, hashes):
+    """
+    Save row hashes and a manifest of row keys changed since the last
+    run. A duplicate id is reported as its own row, see `_row_keys`.
+    """
+    changes = OrderedDict()
+    changes['added'] = [key for key in hashes if key not in manifest]
+    changes['changed'] = [key for key in hashes if key in manifest and manifest[key] != hashes[key]]
+    changes['removed'] = [key for key in manifest if key not in hashes]
+
+    with open(SONGS_MANIFEST_PATH, 'w') as f:
+        json.dump(hashes, f, indent=4)
+
+    with open(SONGS_CHANGES_PATH, 'w') as f:
+        json.dump(changes, f, indent=4)
+
+    print 'Added %i, changed %i, removed %i songs' % (len(changes['added']), len(changes['changed']), len(changes['removed']))
 
 @task
 def generate_rdio_playlist():
@@ -162,90 +323,169 @@ def generate_spotify_playlist():
     """
     Generate a list of Spotify track IDs
     """
-
     sp = spotipy.Spotify()
-    songs = []
-    secrets = app_config.get_secrets()
 
     with open('data/songs.csv') as f:
         rows = csv.DictReader(f)
+        track_ids = [spotify.track_id(row['spotify']) for row in rows if row['spotify'] and 'track' in row['spotify']]
 
-        for row in rows:
-            if row['spotify'] and "track" in row['spotify']:
-                try:
-                    song_object = sp.track(track_id=row['spotify'])
-                    if song_object['track_number']:
-                        songs.append(song_object['uri'])
-                except:
-                    print 'invalid ID'
+    tracks, failed = spotify.resolve_tracks(sp, track_ids)
+    spotify.write_report(failed)
+
+    songs = [tracks[id]['uri'] for id in track_ids if id in tracks and tracks[id]['track_number']]
 
     print ','.join(songs)
 
 
 @task
-def get_mp3_lengths():
-    copy_data = copytext.Copy(app_config.COPY_PATH)
-    tags = copy_data['tags']._serialize().keys()
-    total_minutes = 0
-    clean_minutes = 0
-    clean_count = 0
+def get_mp3_lengths(workers='8', cache_mb='2048'):
+    """
+    Write a report of song counts and durations per tag as CSV and JSON.
+
+    Downloads run in a pool of `workers` threads and any MP3s that must
+    be parsed are handed to a pool of as many processes as they arrive.
+    Set workers=1 to measure songs one at a time. Downloaded MP3s are
+    kept in a cache of at most `cache_mb` megabytes.
+    """
+    tagdata = copy_cache.get_copy()['tags']._serialize()
+    workers = int(workers)
 
     with open('data/songs.json') as f:
         songs = json.load(f)
 
-    tag_durations = OrderedDict()
-    tag_counts = OrderedDict()
-    for tag in tags:
-        tag_durations[tag] = 0
-        tag_counts[tag] = 0
+    links = ['http://podcastdownload.npr.org/anon.npr-mp3%s.mp3' % song['media_url'] for song in songs]
 
-    for song in songs:
-        link = 'http://podcastdownload.npr.org/anon.npr-mp3%s.mp3' % song['media_url']
-        song['length'] = get_mp3_length(link)
-        total_minutes += float(song['length']) / 60
-        if song['explicit'] != 'True':
-            clean_minutes += float(song['length']) / 60
-            clean_count += 1
-
-        for tag in song['genre_tags']:
-            if tag in tags:
-                tag_durations[tag] += float(song['length']) / 60
-                tag_counts[tag] += 1
-
-    with open('data/song-lengths.csv', 'w') as f:
-        writer = csv.writer(f)
-        writer.writerow(['tag', 'count', 'duration (minutes)', 'duration (hours)', 'hours', 'minutes'])
-        for tag in tags:
-            hours, minutes = split_minutes(tag_durations[tag])
-            row = [tag, tag_counts[tag], tag_durations[tag], tag_durations[tag] / 60, hours, minutes]
-            writer.writerow(row)
-        hours, minutes = split_minutes(total_minutes)
-        writer.writerow(['total', len(songs), total_minutes, total_minutes / 60, hours, minutes])
-        writer.writerow(['clean total', clean_count, clean_minutes, '', '', ''])
-
-def get_mp3_length(link):
+    if workers > 1:
+        lengths = _get_mp3_lengths_parallel(links, workers, int(cache_mb) * 1024 * 1024)
+    else:
+        cache = Mp3Cache(max_bytes=int(cache_mb) * 1024 * 1024)
+
+        try:
+            lengths = [get_mp3_length(link, cache=cache) for link in links]
+        finally:
+            cache.close()
+
+    write_reports(aggregate_lengths(songs, lengths, tagdata))
+
+def _get_mp3_lengths_parallel(links, workers, cache_bytes=MP3_CACHE_MAX_BYTES):
     """
-    Get length of mp3
+    Measure many MP3s at once, returning lengths in the order of `links`.
     """
+    # Fork parsers before any threads or database connections exist
+    process_pool = Pool(workers)
+    thread_pool = ThreadPool(workers)
+    session = get_session(workers)
+    cache = Mp3Cache(max_bytes=cache_bytes)
+
+    def fetch(link):
+        length, filepath = _fetch_mp3(link, cache, session)
+
+        if filepath:
+            # The file stays pinned until it has been parsed
+            return process_pool.apply_async(_parse_mp3, (filepath, link), callback=lambda length: cache.unpin(filepath))
+
+        return length
+
+    try:
+        results = thread_pool.map(fetch, links)
+        lengths = [result.get() if isinstance(result, AsyncResult) else result for result in results]
+    finally:
+        thread_pool.close()
+        process_pool.close()
+        thread_pool.join()
+        process_pool.join()
+
     try:
-        os.mkdir('.mp3-cache')
-    except OSError:
-        pass
+        for link, length in zip(links, lengths):
+            if length:
+                cache.set_duration(link, length)
+
+        cache.evict()
+    finally:
+        cache.close()
+
+    return lengths
+
+def get_mp3_length(link, probe=True, cache=None):
+    """
+    Get length of mp3
+
+    Lengths measured on an earlier run are read from the cache index.
+    Otherwise tries to read the length from the file's headers with
+    range requests first and only downloads the whole file if that is
+    inconclusive. Pass a `cache` to share one across calls, otherwise
+    one is opened and closed for this link.
+    """
+    if cache is None:
+        cache = Mp3Cache()
+
+        try:
+            return get_mp3_length(link, probe, cache)
+        finally:
+            cache.close()
+
+    length, filepath = _fetch_mp3(link, cache, probe=probe)
+
+    if filepath:
+        try:
+            length = _parse_mp3(filepath, link)
+        finally:
+            cache.unpin(filepath)
+
+    if length:
+        cache.set_duration(link, length)
+
+    if filepath:
+        cache.evict()
+
+    return length
+
+def _fetch_mp3(link, cache, session=None, probe=True):
+    """
+    Look up, probe or, failing those, download an mp3 to the cache.
+
+    Returns (length, None) if the length is known without the audio,
+    otherwise (None, path to the cached file). The file is pinned, so
+    call `cache.unpin` once it has been parsed. The cache is evicted as
+    each download is stored, keeping it within budget during a run.
+    """
+    length = cache.get_duration(link)
+
+    if length:
+        return length, None
+
+    session = session or requests
+
+    if probe:
+        length = probe_mp3_length(link, session)
 
-    path_parts = link.split('/')
-    filename = '-'.join(path_parts[2:])
-    filename = filename.split('?')[0]
+        if length is not None:
+            return length, None
 
-    filepath = os.path.join('.mp3-cache', filename)
+        print 'Headers inconclusive for %s' % link
 
-    if not os.path.isfile(filepath):
+    filepath = cache.get_path(link, pin=True)
+
+    if not filepath:
         print 'Downloading %s' % link
-        resp = requests.get(link)
 
-        with open(filepath, 'wb') as f:
-            for block in resp.iter_content(1024):
-                f.write(block)
+        # A dead link is reported as length 0, like an unreadable file
+        try:
+            resp = session.get(link, stream=True)
+            resp.raise_for_status()
+            filepath = cache.store(link, resp.iter_content(65536), pin=True)
+        except requests.RequestException:
+            print 'ERROR: Downloading %s failed' % link
+            return 0, None
+
+        cache.evict()
+
+    return None, filepath
 
+def _parse_mp3(filepath, link):
+    """
+    Read the length of a downloaded mp3.
+    """
     try:
         print 'Opening %s' % link
         audio = MP3(filepath)
@@ -254,120 +494,215 @@ def get_mp3_length(link):
         print 'ERROR: Opening %s failed' % link
         return 0
 
-def split_minutes(minutes):
-    """
-    Format 00:00:00 style lengths
+@task
+def process_album_art(interactive='false', workers=None):
     """
-    hours, minutes = divmod(minutes, 60)
-    return int(hours), int(minutes)
+    Render resized cover art for every song.
 
-@task
-def process_album_art():
+    Each source image is rendered at every size and format in
+    images.DERIVATIVES across a pool of `workers` processes, and the
+    results are recorded in data/covers.json for building srcsets. Only
+    derivatives whose source, parameters or output changed are rendered.
+
+    Art is matched to songs by normalized filename. Files whose name is
+    only a prefix of a song id are listed in ALBUM_ART_REPORT_PATH rather
+    than prompted for, unless interactive=true, in which case you are
+    asked about each of them once all songs have been matched.
+    """
     with open('data/songs.json') as f:
         songs = json.load(f)
 
-    filenames = []
-    for rawfilename in os.listdir('www/assets/covers-src'):
-        filename = rawfilename.split('.')[0]
-        if filename == '':
+    exact, prefixes = _index_album_art(os.listdir(COVERS_SRC_PATH))
+    derivatives = supported_derivatives()
+
+    if os.path.isfile(COVERS_MANIFEST_PATH):
+        with open(COVERS_MANIFEST_PATH) as f:
+            manifest = json.load(f)
+    else:
+        manifest = {}
+
+    sources = {}
+    jobs = []
+
+    report = OrderedDict()
+    report['prefix_matches'] = []
+    report['missing'] = []
+
+    for song in songs:
+        id = song['id'].replace('-', '')
+
+        if id in exact:
+            source_path = os.path.join(COVERS_SRC_PATH, exact[id])
+            source = describe_source(source_path, manifest.get(song['id']))
+            stale = stale_derivatives(song['id'], source, manifest.get(song['id']), derivatives)
+
+            sources[song['id']] = source
+
+            if stale:
+                jobs.append((song['id'], source_path, stale))
             continue
+
+        candidates = []
+
+        # Every prefix of the id that names a file is a candidate
+        for i in range(1, len(id)):
+            candidates.extend(prefixes.get(id[:i], []))
+
+        if candidates:
+            report['prefix_matches'].append(OrderedDict([
+                ('id', song['id']),
+                ('candidates', candidates)
+            ]))
+        else:
+            print 'ERROR: could not find art for %s' % song['id']
+            report['missing'].append(song['id'])
+
+    manifest = _render_album_art(jobs, sources, manifest, derivatives, int(workers) if workers else None)
+
+    with open(COVERS_MANIFEST_PATH, 'w') as f:
+        json.dump(manifest, f, sort_keys=True)
+
+    with open(ALBUM_ART_REPORT_PATH, 'w') as f:
+        json.dump(report, f, indent=4)
+
+    print '%i songs have art that needs confirming, %i have no art. See %s' % (len(report['prefix_matches']), len(report['missing']), ALBUM_ART_REPORT_PATH)
+
+    if interactive == 'true':
+        for match in report['prefix_matches']:
+            for path in match['candidates']:
+                createfile = confirm_bool(u'Is www/assets/covers-src/%s path correct for %s?' % (path.decode('utf-8'), match['id']))
+                if createfile:
+                    os.rename('www/assets/covers-src/%s' % path, 'www/assets/covers-src/%s.jpg' % match['id'])
+                    break
+
+def _render_album_art(jobs, sources, manifest, derivatives, workers=None):
+    """
+    Render stale cover derivatives in a process pool.
+
+    Returns a new manifest covering every song in `sources` that has
+    been rendered. Songs with nothing to render and no earlier entry,
+    such as when no derivative formats are supported, are reported and
+    left out.
+    """
+    rendered = {}
+
+    if jobs:
+        print 'Rendering %i images for %i songs' % (sum(len(job[2]) for job in jobs), len(jobs))
+
+        pool = Pool(workers)
+
+        try:
+            rendered = dict(pool.map(render_derivatives, jobs))
+        finally:
+            pool.close()
+            pool.join()
+
+    updated = {}
+
+    for id, source in sources.items():
+        if id in rendered:
+            updated[id] = merge_entry(id, manifest.get(id), source, rendered[id], derivatives)
+        elif id in manifest:
+            updated[id] = dict(manifest[id], source=source)
+        else:
+            print 'ERROR: no images were rendered for %s' % id
+
+    return updated
+
+def _index_album_art(rawfilenames):
+    """
+    Index cover art filenames by their normalized names.
+
+    Returns a dict of names to the first file with that name and a dict
+    of names to every file with that name, for prefix lookups.
+    """
+    exact = {}
+    prefixes = defaultdict(list)
+
+    for rawfilename in sorted(rawfilenames):
+        filename = rawfilename.split('.')[0]
         if filename.endswith('-sq'):
             filename = filename[:-3]
         filename = filename.lower().replace('-', '')
         filename = filename.decode('utf-8')
-        filenames.append((rawfilename, filename))
-
-    for song in songs:
-        success = False
-        id = song['id'].replace('-', '')
-        for path, filename in filenames:
-            if id == filename:
-                if not os.path.isfile('www/assets/covers/%s.jpg' % song['id']):
-                    image = Image.open('www/assets/covers-src/%s' % path).convert('RGB')
-                    image.thumbnail((500, 500), Image.ANTIALIAS)
-                    image.save('www/assets/covers/%s.jpg' % song['id'], optimize=True)
-                success = True
-                break
-            elif id.startswith(filename):
-                try:
-                    createfile = confirm_bool('Is www/assets/covers-src/%s path correct for %s?' % (path, song['id'].decode('utf-8')))
-                    if createfile:
-                        os.rename('www/assets/covers-src/%s' % path, 'www/assets/covers-src/%s.jpg' % song['id'])
-                except UnicodeEncodeError:
-                    print 'dammit'
-                success = True
-                break
+        if filename == '':
+            continue
 
-        if not success:
-            print 'ERROR: could not find art for %s' % song['id']
+        exact.setdefault(filename, rawfilename)
+        prefixes[filename].append(rawfilename)
 
+    return exact, prefixes
 
 @task
 def update_featured_social():
     """
-    Update featured tweets
+    Update featured tweets and Facebook posts
     """
-    COPY = copytext.Copy(app_config.COPY_PATH)
+    COPY = copy_cache.get_copy()
     secrets = app_config.get_secrets()
 
-    # Twitter
-    print 'Fetching tweets...'
-
-    twitter_api = Twitter(
-        auth=OAuth(
+    client = SocialClient(
+        OAuth(
             secrets['TWITTER_API_OAUTH_TOKEN'],
             secrets['TWITTER_API_OAUTH_SECRET'],
             secrets['TWITTER_API_CONSUMER_KEY'],
             secrets['TWITTER_API_CONSUMER_SECRET']
-        )
+        ),
+        secrets['FACEBOOK_API_APP_TOKEN']
     )
 
-    tweets = []
+    print 'Fetching tweets and Facebook posts...'
+
+    output = get_featured_social(
+        client,
+        _featured_ids(COPY, 'featured_tweet'),
+        _featured_ids(COPY, 'featured_facebook')
+    )
+
+    with open('data/featured.json', 'w') as f:
+        json.dump(output, f)
+
+def _featured_ids(COPY, key):
+    """
+    Get object ids from the featured_<key>1-3 URLs in the share sheet.
+    """
+    ids = []
 
     for i in range(1, 4):
-        tweet_url = COPY['share']['featured_tweet%i' % i]
+        url = COPY['share']['%s%i' % (key, i)]
 
-        if isinstance(tweet_url, copytext.Error) or unicode(tweet_url).strip() == '':
+        if isinstance(url, copytext.Error) or unicode(url).strip() == '':
             continue
 
-        tweet_id = unicode(tweet_url).split('/')[-1]
+        ids.append(unicode(url).split('/')[-1])
+
+    return ids
+
+def get_featured_social(client, tweet_ids, facebook_ids):
+    """
+    Fetch featured content with a social.SocialClient and format it for
+    data/featured.json.
+    """
+    raw_tweets, raw_posts = fetch_featured(client, tweet_ids, facebook_ids)
 
-        tweet = twitter_api.statuses.show(id=tweet_id)
+    tweets = []
 
+    for tweet in raw_tweets:
         creation_date = datetime.strptime(tweet['created_at'],'%a %b %d %H:%M:%S +0000 %Y')
         creation_date = '%s %i' % (creation_date.strftime('%b'), creation_date.day)
 
         tweet_url = 'http://twitter.com/%s/status/%s' % (tweet['user']['screen_name'], tweet['id'])
 
         photo = None
-        html = tweet['text']
-        subs = {}
 
         for media in tweet['entities'].get('media', []):
-            original = tweet['text'][media['indices'][0]:media['indices'][1]]
-            replacement = '<a href="%s" target="_blank" onclick="_gaq.push([\'_trackEvent\', \'%s\', \'featured-tweet-action\', \'link\', 0, \'%s\']);">%s</a>' % (media['url'], app_config.PROJECT_SLUG, tweet_url, media['display_url'])
-
-            subs[original] = replacement
-
-            if media['type'] == 'photo' and not photo:
+            if media['type'] == 'photo':
                 photo = {
                     'url': media['media_url']
                 }
+                break
 
-        for url in tweet['entities'].get('urls', []):
-            original = tweet['text'][url['indices'][0]:url['indices'][1]]
-            replacement = '<a href="%s" target="_blank" onclick="_gaq.push([\'_trackEvent\', \'%s\', \'featured-tweet-action\', \'link\', 0, \'%s\']);">%s</a>' % (url['url'], app_config.PROJECT_SLUG, tweet_url, url['display_url'])
-
-            subs[original] = replacement
-
-        for hashtag in tweet['entities'].get('hashtags', []):
-            original = tweet['text'][hashtag['indices'][0]:hashtag['indices'][1]]
-            replacement = '<a href="https://twitter.com/hashtag/%s" target="_blank" onclick="_gaq.push([\'_trackEvent\', \'%s\', \'featured-tweet-action\', \'hashtag\', 0, \'%s\']);">%s</a>' % (hashtag['text'], app_config.PROJECT_SLUG, tweet_url, '#%s' % hashtag['text'])
-
-            subs[original] = replacement
-
-        for original, replacement in subs.items():
-            html =  html.replace(original, replacement)
+        html = link_tweet_entities(tweet, tweet_url)
 
         # https://dev.twitter.com/docs/api/1.1/get/statuses/show/%3Aid
         tweets.append({
@@ -387,27 +722,11 @@ def update_featured_social():
             'photo': photo
         })
 
-    # Facebook
-    print 'Fetching Facebook posts...'
-
-    fb_api = GraphAPI(secrets['FACEBOOK_API_APP_TOKEN'])
-
     facebook_posts = []
 
-    for i in range(1, 4):
-        fb_url = COPY['share']['featured_facebook%i' % i]
-
-        if isinstance(fb_url, copytext.Error) or unicode(fb_url).strip() == '':
-            continue
-
-        fb_id = unicode(fb_url).split('/')[-1]
-
-        post = fb_api.get_object(fb_id)
-        user  = fb_api.get_object(post['from']['id'])
-        user_picture = fb_api.get_object('%s/picture' % post['from']['id'])
-        likes = fb_api.get_object('%s/likes' % fb_id, summary='true')
-        comments = fb_api.get_object('%s/comments' % fb_id, summary='true')
-        #shares = fb_api.get_object('%s/sharedposts' % fb_id)
+    for raw_post in raw_posts:
+        post = raw_post['post']
+        user = raw_post['user']
 
         creation_date = datetime.strptime(post['created_time'],'%Y-%m-%dT%H:%M:%S+0000')
         creation_date = '%s %i' % (creation_date.strftime('%b'), creation_date.day)
@@ -426,19 +745,14 @@ def update_featured_social():
             'from': {
                 'name': user['name'],
                 'link': user['link'],
-                'picture': user_picture['url']
+                'picture': raw_post['user_picture']['url']
             },
-            'likes': likes['summary']['total_count'],
-            'comments': comments['summary']['total_count'],
-            #'shares': shares['summary']['total_count'],
+            'likes': raw_post['likes']['summary']['total_count'],
+            'comments': raw_post['comments']['summary']['total_count'],
             'creation_date': creation_date
         })
 
-    # Render to JSON
-    output = {
+    return {
         'tweets': tweets,
         'facebook_posts': facebook_posts
     }
-
-    with open('data/featured.json', 'w') as f:
-        json.dump(output, f)
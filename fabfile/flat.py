@@ -45,13 +45,19 @@ def deploy_file(bucket, src, dst, headers={}):
     if os.path.splitext(src)[1].lower() in GZIP_FILE_TYPES:
         file_headers['Content-Encoding'] = 'gzip'
 
-        with open(src, 'rb') as f_in:
-            contents = f_in.read()
-
         output = StringIO()
-        f_out = gzip.GzipFile(filename=dst, mode='wb', fileobj=output)
-        f_out.write(contents)
-        f_out.close()
+
+        # Use a precompressed sibling, see `utils.write_json`
+        if utils.has_fresh_gzip(src):
+            with open(utils.gzip_path(src), 'rb') as f_in:
+                output.write(f_in.read())
+        else:
+            with open(src, 'rb') as f_in:
+                contents = f_in.read()
+
+            f_out = gzip.GzipFile(filename=dst, mode='wb', fileobj=output)
+            f_out.write(contents)
+            f_out.close()
 
         local_md5 = hashlib.md5()
         local_md5.update(output.getvalue())
@@ -88,6 +94,10 @@ def deploy_folder(bucket_name, src, dst, headers={}, ignore=[]):
             if name.startswith('.'):
                 continue
 
+            # Precompressed siblings are uploaded in place of their source
+            if name.endswith('.gz') and os.path.isfile(os.path.join(local_path, name[:-3])):
+                continue
+
             src_path = os.path.join(local_path, name)
 
             skip = False
@@ -0,0 +1,209 @@
+#!/usr/bin/env python
+
+"""
+Utilities for rendering resized cover art.
+
+data/covers.json records, for each song, the hash of its source image
+and the parameters and hash of every file rendered from it, so only
+stale derivatives are ever rendered again.
+"""
+
+import hashlib
+import os
+
+from PIL import Image
+from shutil import copyfile
+
+COVERS_SRC_PATH = 'www/assets/covers-src'
+COVERS_PATH = 'www/assets/covers'
+COVERS_MANIFEST_PATH = 'data/covers.json'
+
+# The 500px JPEG is also written as <id>.jpg, which templates use as src
+DEFAULT_SIZE = 500
+
+DERIVATIVES = [
+    { 'size': 100, 'format': 'JPEG' },
+    { 'size': 250, 'format': 'JPEG' },
+    { 'size': 500, 'format': 'JPEG' },
+    { 'size': 100, 'format': 'WEBP' },
+    { 'size': 250, 'format': 'WEBP' },
+    { 'size': 500, 'format': 'WEBP' }
+]
+
+EXTENSIONS = {
+    'JPEG': 'jpg',
+    'WEBP': 'webp'
+}
+
+SAVE_OPTIONS = {
+    'JPEG': { 'quality': 85, 'optimize': True, 'progressive': True },
+    'WEBP': { 'quality': 80 }
+}
+
+def supported_derivatives(derivatives=DERIVATIVES):
+    """
+    Filter out derivatives in formats this Pillow build can't write.
+    """
+    Image.init()
+
+    return [derivative for derivative in derivatives if derivative['format'] in Image.SAVE]
+
+def derivative_path(id, derivative):
+    """
+    Get the output path of one derivative of a song's cover.
+    """
+    extension = EXTENSIONS[derivative['format']]
+
+    return os.path.join(COVERS_PATH, '%s-%i.%s' % (id, derivative['size'], extension))
+
+def default_path(id):
+    """
+    Get the path of the cover used when no srcset applies.
+    """
+    return os.path.join(COVERS_PATH, '%s.jpg' % id)
+
+def derivative_params(derivative):
+    """
+    Everything that affects the output of a derivative.
+    """
+    return {
+        'size': derivative['size'],
+        'format': derivative['format'],
+        'options': SAVE_OPTIONS[derivative['format']]
+    }
+
+def file_hash(path):
+    """
+    SHA-1 of a file's contents.
+    """
+    sha1 = hashlib.sha1()
+
+    with open(path, 'rb') as f:
+        for block in iter(lambda: f.read(65536), ''):
+            sha1.update(block)
+
+    return sha1.hexdigest()
+
+def describe_source(source_path, entry):
+    """
+    Describe a source image for the manifest. The hash recorded in
+    `entry` is reused if the file's mtime and size have not changed.
+    """
+    stat = os.stat(source_path)
+    source = {
+        'path': source_path,
+        'mtime': stat.st_mtime,
+        'bytes': stat.st_size
+    }
+
+    previous = (entry or {}).get('source')
+
+    if previous and all(previous.get(key) == source[key] for key in ('path', 'mtime', 'bytes')):
+        source['hash'] = previous['hash']
+    else:
+        source['hash'] = file_hash(source_path)
+
+    return source
+
+def stale_derivatives(id, source, entry, derivatives):
+    """
+    Find the derivatives that must be rendered again: all of them if the
+    source changed, otherwise any whose parameters changed or whose
+    output is missing or has been modified.
+    """
+    if not entry or entry.get('source', {}).get('hash') != source['hash']:
+        return list(derivatives)
+
+    rendered = dict((d['path'], d) for d in entry['derivatives'])
+    stale = []
+
+    for derivative in derivatives:
+        path = derivative_path(id, derivative)
+        previous = rendered.get(os.path.relpath(path, 'www'))
+
+        if derivative['size'] == DEFAULT_SIZE and derivative['format'] == 'JPEG':
+            fresh = _is_fresh(path, previous, derivative) and _is_fresh(default_path(id), entry.get('default'), derivative)
+        else:
+            fresh = _is_fresh(path, previous, derivative)
+
+        if not fresh:
+            stale.append(derivative)
+
+    return stale
+
+def _is_fresh(path, described, derivative):
+    """
+    Check a rendered file still matches its manifest description.
+    """
+    if not described or described['params'] != derivative_params(derivative):
+        return False
+
+    try:
+        return os.path.getsize(path) == described['bytes']
+    except OSError:
+        return False
+
+def merge_entry(id, entry, source, rendered, derivatives):
+    """
+    Combine an existing manifest entry with newly rendered derivatives.
+    Derivatives that are no longer configured are dropped.
+    """
+    previous = dict((d['path'], d) for d in (entry or {}).get('derivatives', []))
+    previous.update((d['path'], d) for d in rendered['derivatives'])
+
+    return {
+        'source': source,
+        'default': rendered['default'] or (entry or {}).get('default'),
+        'derivatives': [previous[os.path.relpath(derivative_path(id, d), 'www')] for d in derivatives]
+    }
+
+def render_derivatives(job):
+    """
+    Render every derivative of a single source image.
+
+    `job` is a tuple of (song id, source path, derivatives) so this can
+    be mapped over a process pool. Returns the id and a manifest entry
+    listing the default image and each derivative written.
+    """
+    id, source_path, derivatives = job
+
+    scaled = {}
+    image = Image.open(source_path).convert('RGB')
+
+    # Largest first, so each size is scaled from the one before it
+    for size in sorted(set(d['size'] for d in derivatives), reverse=True):
+        image = image.copy()
+        image.thumbnail((size, size), Image.ANTIALIAS)
+        scaled[size] = image
+
+    entry = {
+        'default': None,
+        'derivatives': []
+    }
+
+    for derivative in derivatives:
+        image = scaled[derivative['size']]
+        path = derivative_path(id, derivative)
+        image.save(path, derivative['format'], **SAVE_OPTIONS[derivative['format']])
+
+        entry['derivatives'].append(_describe(path, image, derivative))
+
+        if derivative['size'] == DEFAULT_SIZE and derivative['format'] == 'JPEG':
+            copyfile(path, default_path(id))
+            entry['default'] = _describe(default_path(id), image, derivative)
+
+    return id, entry
+
+def _describe(path, image, derivative):
+    """
+    Describe a rendered file for the manifest.
+    """
+    return {
+        'path': os.path.relpath(path, 'www'),
+        'format': derivative['format'],
+        'width': image.size[0],
+        'height': image.size[1],
+        'bytes': os.path.getsize(path),
+        'hash': file_hash(path),
+        'params': derivative_params(derivative)
+    }
@@ -0,0 +1,108 @@
+#!/usr/bin/env python
+
+"""
+Aggregate song durations by tag.
+
+Songs and tags are laid out as a boolean membership matrix so every
+total (overall, clean/explicit and per tag) comes from a few array
+operations instead of nested loops.
+"""
+
+import csv
+import json
+import numpy
+
+from collections import OrderedDict
+
+CSV_PATH = 'data/song-lengths.csv'
+JSON_PATH = 'data/song-lengths.json'
+
+CSV_COLUMNS = ['tag', 'count', 'duration (minutes)', 'duration (hours)', 'hours', 'minutes', 'type', 'clean count', 'clean duration (minutes)', 'explicit count', 'explicit duration (minutes)']
+
+def membership_matrix(songs, tags):
+    """
+    Build a songs x tags boolean matrix. Unknown tags are ignored.
+    """
+    tag_index = dict((tag, i) for i, tag in enumerate(tags))
+    matrix = numpy.zeros((len(songs), len(tags)), dtype=bool)
+
+    for i, song in enumerate(songs):
+        for tag in song['genre_tags']:
+            j = tag_index.get(tag)
+
+            if j is not None:
+                matrix[i, j] = True
+
+    return matrix
+
+def aggregate_lengths(songs, lengths, tagdata):
+    """
+    Total song counts and durations in minutes overall, for clean and
+    explicit songs, and for each tag in `tagdata` (the serialized tags
+    sheet of the copy).
+    """
+    tags = tagdata.keys()
+    matrix = membership_matrix(songs, tags)
+    minutes = numpy.array(lengths, dtype=float) / 60
+    explicit = numpy.array([song['explicit'] == 'True' for song in songs], dtype=bool)
+    clean = ~explicit
+
+    def totals(mask):
+        return matrix[mask].sum(axis=0), minutes[mask].dot(matrix[mask])
+
+    counts, durations = totals(numpy.ones(len(songs), dtype=bool))
+    clean_counts, clean_durations = totals(clean)
+    explicit_counts, explicit_durations = totals(explicit)
+
+    report = OrderedDict()
+    report['tags'] = []
+
+    for j, tag in enumerate(tags):
+        report['tags'].append(OrderedDict([
+            ('tag', tag),
+            ('type', 'genre' if tagdata[tag].get('genre') == 'True' else 'playlist'),
+            ('count', int(counts[j])),
+            ('minutes', float(durations[j])),
+            ('clean_count', int(clean_counts[j])),
+            ('clean_minutes', float(clean_durations[j])),
+            ('explicit_count', int(explicit_counts[j])),
+            ('explicit_minutes', float(explicit_durations[j]))
+        ]))
+
+    report['total'] = OrderedDict([
+        ('count', len(songs)),
+        ('minutes', float(minutes.sum())),
+        ('clean_count', int(clean.sum())),
+        ('clean_minutes', float(minutes[clean].sum())),
+        ('explicit_count', int(explicit.sum())),
+        ('explicit_minutes', float(minutes[explicit].sum()))
+    ])
+
+    return report
+
+def write_reports(report, csv_path=CSV_PATH, json_path=JSON_PATH):
+    """
+    Write an aggregate report as CSV and JSON.
+    """
+    with open(csv_path, 'w') as f:
+        writer = csv.writer(f)
+        writer.writerow(CSV_COLUMNS)
+
+        for row in report['tags']:
+            hours, minutes = split_minutes(row['minutes'])
+            writer.writerow([row['tag'], row['count'], row['minutes'], row['minutes'] / 60, hours, minutes, row['type'], row['clean_count'], row['clean_minutes'], row['explicit_count'], row['explicit_minutes']])
+
+        total = report['total']
+        hours, minutes = split_minutes(total['minutes'])
+        writer.writerow(['total', total['count'], total['minutes'], total['minutes'] / 60, hours, minutes, '', total['clean_count'], total['clean_minutes'], total['explicit_count'], total['explicit_minutes']])
+        writer.writerow(['clean total', total['clean_count'], total['clean_minutes'], '', '', ''])
+
+    with open(json_path, 'w') as f:
+        json.dump(report, f)
+
+def split_minutes(minutes):
+    """
+    Format 00:00:00 style lengths
+    """
+    hours, minutes = divmod(minutes, 60)
+    return int(hours), int(minutes)
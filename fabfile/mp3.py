@@ -0,0 +1,244 @@
+#!/usr/bin/env python
+
+"""
+Utilities for measuring MP3 durations without downloading whole files.
+
+The duration of an MP3 can usually be read from the first audio frame:
+VBR files carry a Xing/Info or VBRI header with a frame count and CBR
+files can be measured from their bitrate and Content-Length.
+"""
+
+import re
+import struct
+
+import requests
+
+# Enough for a typical ID3v2 tag plus the first audio frame
+PROBE_BYTES = 16384
+TIMEOUT = 30
+
+# Bitrates in kbps, indexed by [version][layer][bitrate index]
+BITRATES = {
+    'MPEG1': {
+        1: [0, 32, 64, 96, 128, 160, 192, 224, 256, 288, 320, 352, 384, 416, 448],
+        2: [0, 32, 48, 56, 64, 80, 96, 112, 128, 160, 192, 224, 256, 320, 384],
+        3: [0, 32, 40, 48, 56, 64, 80, 96, 112, 128, 160, 192, 224, 256, 320]
+    },
+    'MPEG2': {
+        1: [0, 32, 48, 56, 64, 80, 96, 112, 128, 144, 160, 176, 192, 224, 256],
+        2: [0, 8, 16, 24, 32, 40, 48, 56, 64, 80, 96, 112, 128, 144, 160],
+        3: [0, 8, 16, 24, 32, 40, 48, 56, 64, 80, 96, 112, 128, 144, 160]
+    }
+}
+
+SAMPLE_RATES = {
+    'MPEG1': [44100, 48000, 32000],
+    'MPEG2': [22050, 24000, 16000],
+    'MPEG2.5': [11025, 12000, 8000]
+}
+
+VERSIONS = {
+    0: 'MPEG2.5',
+    2: 'MPEG2',
+    3: 'MPEG1'
+}
+
+# Layer bits, 1 = Layer III, 2 = Layer II, 3 = Layer I
+LAYERS = {
+    1: 3,
+    2: 2,
+    3: 1
+}
+
+CONTENT_RANGE_RE = re.compile(r'bytes (\d+)-(\d+)/(\d+)')
+
+def parse_frame_header(data, offset):
+    """
+    Decode the four byte MPEG audio frame header at `offset`.
+
+    Returns None if the bytes are not a valid header.
+    """
+    if offset + 4 > len(data):
+        return None
+
+    b0, b1, b2, b3 = struct.unpack('>4B', data[offset:offset + 4])
+
+    if b0 != 0xFF or (b1 & 0xE0) != 0xE0:
+        return None
+
+    version = VERSIONS.get((b1 >> 3) & 3)
+    layer = LAYERS.get((b1 >> 1) & 3)
+    bitrate_index = b2 >> 4
+    sample_rate_index = (b2 >> 2) & 3
+
+    # Free format and "bad" bitrates can't be measured from the header
+    if not version or not layer or bitrate_index in (0, 15) or sample_rate_index == 3:
+        return None
+
+    bitrate = BITRATES['MPEG1' if version == 'MPEG1' else 'MPEG2'][layer][bitrate_index] * 1000
+    sample_rate = SAMPLE_RATES[version][sample_rate_index]
+    padding = (b2 >> 1) & 1
+    mono = (b3 >> 6) == 3
+
+    if layer == 1:
+        samples = 384
+        length = (12 * bitrate / sample_rate + padding) * 4
+    elif layer == 3 and version != 'MPEG1':
+        samples = 576
+        length = 72 * bitrate / sample_rate + padding
+    else:
+        samples = 1152
+        length = 144 * bitrate / sample_rate + padding
+
+    return {
+        'version': version,
+        'layer': layer,
+        'bitrate': bitrate,
+        'sample_rate': sample_rate,
+        'samples': samples,
+        'length': length,
+        'mono': mono
+    }
+
+def id3v2_size(data):
+    """
+    Return the size of a leading ID3v2 tag, or 0 if there is none.
+    """
+    if len(data) < 10 or data[:3] != 'ID3':
+        return 0
+
+    flags = ord(data[5])
+    size = 0
+
+    # Tag sizes are "syncsafe": 7 bits per byte
+    for byte in data[6:10]:
+        size = (size << 7) | (ord(byte) & 0x7F)
+
+    size += 10
+
+    if flags & 0x10:
+        size += 10
+
+    return size
+
+def find_first_frame(data, start=0):
+    """
+    Find the first frame header at or after `start`. A candidate only
+    counts when the frame after it (if within `data`) is also valid.
+
+    Returns (offset, header) or (None, None).
+    """
+    offset = data.find('\xff', start)
+
+    while offset != -1:
+        header = parse_frame_header(data, offset)
+
+        if header:
+            next_offset = offset + header['length']
+
+            if next_offset + 4 > len(data) or parse_frame_header(data, next_offset):
+                return offset, header
+
+        offset = data.find('\xff', offset + 1)
+
+    return None, None
+
+def vbr_frame_count(data, offset, header):
+    """
+    Read the frame count from a Xing/Info or VBRI header in the frame at
+    `offset`. Returns None if there is neither.
+    """
+    if header['layer'] == 3:
+        if header['version'] == 'MPEG1':
+            side_info = 17 if header['mono'] else 32
+        else:
+            side_info = 9 if header['mono'] else 17
+
+        xing = offset + 4 + side_info
+
+        if data[xing:xing + 4] in ('Xing', 'Info') and len(data) >= xing + 12:
+            flags = struct.unpack('>I', data[xing + 4:xing + 8])[0]
+
+            if flags & 1:
+                return struct.unpack('>I', data[xing + 8:xing + 12])[0]
+
+    vbri = offset + 36
+
+    if data[vbri:vbri + 4] == 'VBRI' and len(data) >= vbri + 18:
+        return struct.unpack('>I', data[vbri + 14:vbri + 18])[0]
+
+    return None
+
+def duration_from_header(data, data_offset, audio_start, total_size):
+    """
+    Compute a duration in seconds from the bytes at the start of an MP3.
+
+    `data` holds the file's bytes from `data_offset`, which must be at or
+    before `audio_start`; `total_size` is the size of the whole file.
+    Returns None if inconclusive.
+    """
+    offset, header = find_first_frame(data, audio_start - data_offset)
+
+    if offset is None:
+        return None
+
+    frames = vbr_frame_count(data, offset, header)
+
+    if frames:
+        return float(frames * header['samples']) / header['sample_rate']
+
+    if not total_size:
+        return None
+
+    # No VBR header, so assume a constant bitrate
+    return (total_size - data_offset - offset) * 8.0 / header['bitrate']
+
+def _fetch_range(session, link, start, end):
+    """
+    Fetch bytes start-end (inclusive) of a remote file.
+
+    Returns (data, total_size) or (None, None) if the server does not
+    honor the range.
+    """
+    response = session.get(link, headers={'Range': 'bytes=%i-%i' % (start, end)}, stream=True, timeout=TIMEOUT)
+
+    try:
+        if response.status_code != 206:
+            return None, None
+
+        match = CONTENT_RANGE_RE.match(response.headers.get('Content-Range', ''))
+
+        if not match or int(match.group(1)) != start:
+            return None, None
+
+        return response.raw.read(end - start + 1), int(match.group(3))
+    finally:
+        response.close()
+
+def probe_mp3_length(link, session=None):
+    """
+    Measure the duration of a remote MP3 from its headers using range
+    requests. Returns None if the headers are inconclusive.
+    """
+    session = session or requests.Session()
+
+    try:
+        data, total_size = _fetch_range(session, link, 0, PROBE_BYTES - 1)
+
+        if data is None:
+            return None
+
+        data_offset = 0
+        audio_start = id3v2_size(data)
+
+        # Large tags (e.g. with cover art) push the first frame further out
+        if audio_start + 4 > len(data):
+            data_offset = audio_start
+            data, _ = _fetch_range(session, link, audio_start, audio_start + PROBE_BYTES - 1)
+
+            if data is None:
+                return None
+    except requests.RequestException:
+        return None
+
+    return duration_from_header(data, data_offset, audio_start, total_size)
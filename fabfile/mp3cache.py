@@ -0,0 +1,221 @@
+#!/usr/bin/env python
+
+"""
+A size-bounded, content-addressed cache of downloaded MP3s.
+
+An sqlite index maps each URL to the hash, size and measured duration of
+its audio, so tracks that have been measured once are never reopened.
+Files are named by their SHA-1 and evicted least recently used first
+when the cache grows past its byte budget. Files waiting to be measured
+are pinned so eviction leaves them alone.
+"""
+
+import hashlib
+import os
+import re
+import sqlite3
+import tempfile
+import threading
+import time
+
+from collections import Counter
+
+CACHE_PATH = '.mp3-cache'
+INDEX_FILENAME = 'index.sqlite'
+
+# Cached audio, named by the SHA-1 of its contents
+AUDIO_FILENAME = re.compile(r'^[0-9a-f]{40}\.mp3$')
+
+# 2GB
+MAX_BYTES = 2 * 1024 * 1024 * 1024
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS tracks (
+    url TEXT PRIMARY KEY,
+    hash TEXT,
+    size INTEGER,
+    duration REAL,
+    fetched REAL,
+    accessed REAL
+)
+"""
+
+class Mp3Cache(object):
+    """
+    Index and storage for downloaded MP3s. Safe to share between threads.
+    """
+    def __init__(self, path=CACHE_PATH, max_bytes=MAX_BYTES):
+        self.path = path
+        self.max_bytes = max_bytes
+        self.lock = threading.Lock()
+        self.pinned = Counter()
+
+        if not os.path.isdir(path):
+            os.makedirs(path)
+
+        self.db = sqlite3.connect(os.path.join(path, INDEX_FILENAME), check_same_thread=False)
+        self.db.execute(SCHEMA)
+        self.db.commit()
+
+        self._remove_legacy_files()
+
+    def _remove_legacy_files(self):
+        """
+        Delete downloads named after their URL by the old cache layout.
+        They are not in the index and their URLs cannot be recovered from
+        their names, so they would never be used or evicted.
+        """
+        removed = 0
+
+        for filename in os.listdir(self.path):
+            if filename.startswith(INDEX_FILENAME) or filename.endswith('.part') or AUDIO_FILENAME.match(filename):
+                continue
+
+            filepath = os.path.join(self.path, filename)
+
+            if os.path.isfile(filepath):
+                os.remove(filepath)
+                removed += 1
+
+        if removed:
+            print 'Removed %i files left by the old .mp3-cache layout' % removed
+
+    def _file_path(self, content_hash):
+        return os.path.join(self.path, '%s.mp3' % content_hash)
+
+    def get_duration(self, url):
+        """
+        Return the measured duration of a URL or None.
+        """
+        with self.lock:
+            row = self.db.execute('SELECT duration FROM tracks WHERE url = ?', (url,)).fetchone()
+
+        if row:
+            return row[0]
+
+        return None
+
+    def set_duration(self, url, duration):
+        """
+        Record the measured duration of a URL.
+        """
+        with self.lock:
+            self.db.execute('INSERT OR IGNORE INTO tracks (url) VALUES (?)', (url,))
+            self.db.execute('UPDATE tracks SET duration = ?, accessed = ? WHERE url = ?', (duration, time.time(), url))
+            self.db.commit()
+
+    def get_path(self, url, pin=False):
+        """
+        Return the path of a URL's cached audio or None. With pin=True
+        the file is kept until `unpin` is called with its path.
+        """
+        with self.lock:
+            row = self.db.execute('SELECT hash FROM tracks WHERE url = ?', (url,)).fetchone()
+
+            if not row or not row[0]:
+                return None
+
+            path = self._file_path(row[0])
+
+            if not os.path.isfile(path):
+                return None
+
+            self.db.execute('UPDATE tracks SET accessed = ? WHERE url = ?', (time.time(), url))
+            self.db.commit()
+
+            if pin:
+                self.pinned[row[0]] += 1
+
+        return path
+
+    def store(self, url, blocks, pin=False):
+        """
+        Write an iterable of blocks to the cache as the audio for a URL.
+
+        The file is written to a temporary name and only renamed into
+        place once complete, so an interrupted download leaves nothing
+        behind. With pin=True the file is kept until `unpin` is called,
+        so the cache can be evicted before it has been measured. Returns
+        the path of the cached file.
+        """
+        content_hash = hashlib.sha1()
+        size = 0
+
+        fd, temp_path = tempfile.mkstemp(dir=self.path, suffix='.part')
+
+        try:
+            with os.fdopen(fd, 'wb') as f:
+                for block in blocks:
+                    content_hash.update(block)
+                    size += len(block)
+                    f.write(block)
+
+            content_hash = content_hash.hexdigest()
+            path = self._file_path(content_hash)
+            os.rename(temp_path, path)
+        except:
+            os.remove(temp_path)
+            raise
+
+        now = time.time()
+
+        with self.lock:
+            self.db.execute('INSERT OR IGNORE INTO tracks (url) VALUES (?)', (url,))
+            self.db.execute('UPDATE tracks SET hash = ?, size = ?, fetched = ?, accessed = ? WHERE url = ?', (content_hash, size, now, now, url))
+            self.db.commit()
+
+            if pin:
+                self.pinned[content_hash] += 1
+
+        return path
+
+    def unpin(self, path):
+        """
+        Release a file pinned by `get_path` or `store`.
+        """
+        content_hash = os.path.splitext(os.path.basename(path))[0]
+
+        with self.lock:
+            self.pinned[content_hash] -= 1
+
+            if self.pinned[content_hash] <= 0:
+                del self.pinned[content_hash]
+
+    def size(self):
+        """
+        Total bytes of audio in the cache.
+        """
+        with self.lock:
+            row = self.db.execute('SELECT SUM(size) FROM (SELECT DISTINCT hash, size FROM tracks WHERE hash IS NOT NULL)').fetchone()
+
+        return row[0] or 0
+
+    def evict(self):
+        """
+        Delete least recently used audio until the cache is within budget.
+        Pinned files are skipped. Durations are kept, so evicted tracks
+        never need to be refetched just to be measured.
+        """
+        with self.lock:
+            rows = self.db.execute('SELECT hash, size, MAX(accessed) FROM tracks WHERE hash IS NOT NULL GROUP BY hash ORDER BY MAX(accessed)').fetchall()
+            total = sum(size for content_hash, size, accessed in rows)
+
+            for content_hash, size, accessed in rows:
+                if total <= self.max_bytes:
+                    break
+
+                if content_hash in self.pinned:
+                    continue
+
+                try:
+                    os.remove(self._file_path(content_hash))
+                except OSError:
+                    pass
+
+                self.db.execute('UPDATE tracks SET hash = NULL, size = NULL WHERE hash = ?', (content_hash,))
+                total -= size
+
+            self.db.commit()
+
+    def close(self):
+        self.db.close()
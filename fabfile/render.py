@@ -10,6 +10,8 @@ import os
 from fabric.api import local, task
 
 import app
+import copy_cache
+import typography
 
 def _fake_context(path):
     """
@@ -141,3 +143,5 @@ def render_all():
         with open(filename, 'w') as f:
             f.write(content)
 
+    typography.print_stats()
+    copy_cache.print_stats()
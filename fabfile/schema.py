@@ -0,0 +1,210 @@
+#!/usr/bin/env python
+
+"""
+Declarative validation for rows of the songs spreadsheet.
+
+A schema is a list of rules, one per field. `compile_schema` turns each
+rule into a few small check functions once, so validating a row is a
+single pass over precompiled checks. Problems are collected in a
+ValidationReport with the spreadsheet row they came from.
+"""
+
+import json
+import re
+
+from collections import OrderedDict
+from itertools import izip
+from operator import methodcaller
+
+REPORT_PATH = 'data/songs-validation.json'
+
+# Spreadsheet rows are numbered from 1 and the first row is the header
+FIRST_ROW = 2
+
+# Rule keys:
+#   field     - column name
+#   required  - the value must not be empty
+#   pattern   - a regular expression non-empty values must match
+#   choices   - allowed non-empty values, or the name of a set passed at
+#               compile time
+#   separator - the value is a list split on this string; choices apply
+#               to each item
+#   unique    - no two rows may share a non-empty value
+#   level     - 'error' (the default) or 'warning'
+SONG_SCHEMA = [
+    { 'field': 'id', 'required': True, 'unique': True },
+    { 'field': 'artist', 'required': True },
+    { 'field': 'title', 'required': True },
+    { 'field': 'title', 'unique': True, 'level': 'warning' },
+    { 'field': 'media_url', 'required': True, 'pattern': r'^/\S+$' },
+    { 'field': 'media_url', 'unique': True, 'level': 'warning' },
+    { 'field': 'explicit', 'choices': ['True', 'False'] },
+    { 'field': 'featured', 'choices': ['True', 'False'] },
+    { 'field': 'genre_tags', 'separator': ',', 'choices': 'genre_tags', 'level': 'warning' }
+]
+
+# Review ids are checked against the song ids in `data._process_rows`
+REVIEW_SCHEMA = [
+    { 'field': 'id', 'required': True, 'level': 'warning' }
+]
+
+ISSUE_FIELDS = ('sheet', 'row', 'field', 'message', 'value')
+
+class ValidationReport(object):
+    """
+    Errors and warnings found while validating rows. Each is a tuple of
+    ISSUE_FIELDS.
+    """
+    def __init__(self):
+        self.errors = []
+        self.warnings = []
+
+    def add(self, level, sheet, row, field, message, value=None):
+        if level == 'error':
+            self.errors.append((sheet, row, field, message, value))
+        else:
+            self.warnings.append((sheet, row, field, message, value))
+
+    def to_dict(self):
+        return OrderedDict([
+            ('error_count', len(self.errors)),
+            ('warning_count', len(self.warnings)),
+            ('errors', [OrderedDict(zip(ISSUE_FIELDS, issue)) for issue in self.errors]),
+            ('warnings', [OrderedDict(zip(ISSUE_FIELDS, issue)) for issue in self.warnings])
+        ])
+
+    def write(self, path=REPORT_PATH):
+        with open(path, 'w') as f:
+            json.dump(self.to_dict(), f, indent=4)
+
+    def print_summary(self):
+        for level, issues in (('ERROR', self.errors), ('WARNING', self.warnings)):
+            for sheet, row, field, message, value in issues:
+                print '--> %s %s row %i, %s: %s' % (level, sheet, row, field, message)
+
+        print '%i errors, %i warnings' % (len(self.errors), len(self.warnings))
+
+def compile_schema(schema, sheet, context=None):
+    """
+    Compile a schema into a function of (rows, report), where rows is a
+    list of (row number, row) pairs.
+
+    Each rule is turned into checks once, with its pattern, choices and
+    uniqueness state bound in closures. Every check then runs over a
+    whole column, so the per-rule dispatch happens once per sheet rather
+    than once per row, and each field is looked up once per row.
+    `context` maps names used as `choices` to sets of allowed values.
+    Issues are reported in row order.
+    """
+    context = context or {}
+    fields = []
+
+    for rule in schema:
+        if not fields or fields[-1][0] != rule['field']:
+            fields.append((rule['field'], []))
+
+        fields[-1][1].extend(_compile_rule(rule, sheet, context))
+
+    # Values are looked up with `get`, so a missing column is None and
+    # every check treats it like an empty cell
+    getters = [(methodcaller('get', field), checks) for field, checks in fields]
+
+    def validate(rows, report):
+        found = ValidationReport()
+        row_numbers = [row_number for row_number, row in rows]
+        dicts = [row for row_number, row in rows]
+
+        for get, checks in getters:
+            values = map(get, dicts)
+
+            for check in checks:
+                check(row_numbers, values, found)
+
+        # Checks run a column at a time; the sort is stable, so issues in
+        # one row keep the order of the rules
+        row_key = lambda issue: issue[1]
+        report.errors.extend(sorted(found.errors, key=row_key))
+        report.warnings.extend(sorted(found.warnings, key=row_key))
+
+    return validate
+
+def _compile_rule(rule, sheet, context):
+    """
+    Get the checks of a single rule, each a function of (row numbers,
+    values, report) checking one column.
+    """
+    field = rule['field']
+    level = rule.get('level', 'error')
+    separator = rule.get('separator')
+
+    checks = []
+
+    if rule.get('required'):
+        missing = 'Missing %s' % field
+
+        def check_required(row_numbers, values, report):
+            for row_number in [row_number for row_number, value in izip(row_numbers, values) if not value]:
+                report.add(level, sheet, row_number, field, missing)
+
+        checks.append(check_required)
+
+    if 'pattern' in rule:
+        match = re.compile(rule['pattern']).match
+        invalid = 'Invalid %s' % field
+
+        def check_pattern(row_numbers, values, report):
+            for row_number, value in [(row_number, value) for row_number, value in izip(row_numbers, values) if value and not match(value)]:
+                report.add(level, sheet, row_number, field, invalid, value)
+
+        checks.append(check_pattern)
+
+    if 'choices' in rule:
+        choices = rule['choices']
+
+        if isinstance(choices, basestring):
+            choices = context[choices]
+
+        choices = frozenset(choices)
+        message = '%%s is not a valid %s' % field
+
+        if separator:
+            def check_choices(row_numbers, values, report):
+                # Lists repeat a lot, so each distinct one is split once
+                invalid_items = {}
+
+                for value in set(values):
+                    if value:
+                        items = [item for item in (item.strip() for item in value.split(separator)) if item and item not in choices]
+
+                        if items:
+                            invalid_items[value] = items
+
+                if not invalid_items:
+                    return
+
+                for row_number, value in [(row_number, value) for row_number, value in izip(row_numbers, values) if value in invalid_items]:
+                    for item in invalid_items[value]:
+                        report.add(level, sheet, row_number, field, message % item, item)
+        else:
+            def check_choices(row_numbers, values, report):
+                for row_number, value in [(row_number, value) for row_number, value in izip(row_numbers, values) if value and value not in choices]:
+                    report.add(level, sheet, row_number, field, message % value, value)
+
+        checks.append(check_choices)
+
+    if rule.get('unique'):
+        duplicate = 'Duplicate %s, first seen in row %%i' % field
+
+        def check_unique(row_numbers, values, report):
+            # Built backwards, so each value maps to the first row it is in
+            first = dict(izip(reversed(values), reversed(row_numbers)))
+
+            if len(first) == len(values):
+                return
+
+            for row_number, value in [(row_number, value) for row_number, value in izip(row_numbers, values) if value and first[value] != row_number]:
+                report.add(level, sheet, row_number, field, duplicate % first[value], value)
+
+        checks.append(check_unique)
+
+    return checks
@@ -0,0 +1,114 @@
+#!/usr/bin/env python
+
+"""
+Split song data into one file per tag.
+
+The page only needs the songs for the tag a listener picks, so alongside
+data/songs.json the data stage writes a shard per genre and playlist tag,
+a shard of every song for "Play Everything", and a small index of each
+shard's URL, song count, clean (non-explicit) song count and duration.
+"""
+
+import hashlib
+import json
+import os
+import re
+
+from collections import OrderedDict
+from utils import write_json
+
+SHARDS_PATH = 'www/data/songs'
+SHARDS_URL = 'data/songs'
+INDEX_FILENAME = 'index.json'
+ALL_SHARD = 'all'
+
+def shard_filename(tag):
+    """
+    Get a safe filename for a tag's shard. Tags like "R&B" and "R-B"
+    have the same safe name, so a short hash of the tag is appended to
+    keep their shards apart.
+    """
+    tag_hash = hashlib.sha1(tag.encode('utf-8')).hexdigest()[:8]
+
+    return 'tag-%s-%s.json' % (re.sub(r'[^\w-]', '-', tag), tag_hash)
+
+def tag_duration(tag):
+    """
+    Total minutes of a tag from its hours and minutes columns in the copy.
+    """
+    try:
+        return int(float(tag.get('hours') or 0)) * 60 + int(float(tag.get('minutes') or 0))
+    except ValueError:
+        return None
+
+def shard_songs(songs, tags):
+    """
+    Group songs by each of their tags, keeping song order. Tags not in
+    `tags` are ignored.
+    """
+    shards = OrderedDict((tag, []) for tag in tags)
+
+    for song in songs:
+        for tag in song['genre_tags']:
+            if tag in shards:
+                shards[tag].append(song)
+
+    return shards
+
+def clean_count(songs):
+    """
+    Count the songs not marked explicit.
+    """
+    return sum(1 for song in songs if song.get('explicit') != 'True')
+
+def write_shards(songs, tagdata, path=SHARDS_PATH, url=SHARDS_URL):
+    """
+    Write a shard per tag in `tagdata` (the serialized tags sheet of the
+    copy), a shard of all songs and the index. Shards for tags that no
+    longer exist are removed. Returns the index.
+    """
+    if not os.path.isdir(path):
+        os.makedirs(path)
+
+    shards = shard_songs(songs, tagdata.keys())
+    filenames = set([INDEX_FILENAME, '%s.json' % ALL_SHARD])
+
+    index = OrderedDict()
+    index['all'] = OrderedDict([
+        ('url', '%s/%s.json' % (url, ALL_SHARD)),
+        ('count', len(songs)),
+        ('clean_count', clean_count(songs)),
+        ('duration', None)
+    ])
+    index['tags'] = OrderedDict()
+
+    write_json(os.path.join(path, '%s.json' % ALL_SHARD), songs)
+
+    for tag, tag_songs in shards.items():
+        filename = shard_filename(tag)
+        filenames.add(filename)
+
+        write_json(os.path.join(path, filename), tag_songs)
+
+        index['tags'][tag] = OrderedDict([
+            ('url', '%s/%s' % (url, filename)),
+            ('count', len(tag_songs)),
+            ('clean_count', clean_count(tag_songs)),
+            ('duration', tag_duration(tagdata[tag]))
+        ])
+
+    with open(os.path.join(path, INDEX_FILENAME), 'w') as f:
+        json.dump(index, f)
+
+    for filename in os.listdir(path):
+        if filename.endswith('.gz'):
+            source = filename[:-3]
+        else:
+            source = filename
+
+        if source not in filenames:
+            os.remove(os.path.join(path, filename))
+
+    print 'Wrote %i song shards' % (len(shards) + 1)
+
+    return index
@@ -0,0 +1,263 @@
+#!/usr/bin/env python
+
+"""
+Fetch featured tweets and Facebook posts.
+
+Both APIs are read through one pooled session and every raw response is
+kept in a local cache with a per-endpoint TTL, so slow-changing objects
+like user profiles are not refetched on every run.
+"""
+
+import hashlib
+import json
+import os
+import sys
+import tempfile
+import time
+
+from multiprocessing.pool import ThreadPool
+from utils import get_session
+
+import app_config
+
+TWITTER_API_URL = 'https://api.twitter.com/1.1/'
+FACEBOOK_GRAPH_URL = 'https://graph.facebook.com/'
+
+CACHE_PATH = '.social-cache'
+
+# Seconds each kind of response is reused for
+CACHE_TTLS = {
+    'twitter_status': 60 * 10,
+    'facebook_post': 60 * 10,
+    'facebook_user': 60 * 60 * 24,
+    'facebook_picture': 60 * 60 * 24,
+    'facebook_likes': 60 * 5,
+    'facebook_comments': 60 * 5
+}
+
+WORKERS = 8
+TIMEOUT = 10
+
+LINK_TEMPLATE = '<a href="%s" target="_blank" onclick="_gaq.push([\'_trackEvent\', \'%s\', \'featured-tweet-action\', \'%s\', 0, \'%s\']);">%s</a>'
+
+class ApiCache(object):
+    """
+    Raw API responses stored as JSON files, one per request.
+    """
+    def __init__(self, path=CACHE_PATH, ttls=CACHE_TTLS):
+        self.path = path
+        self.ttls = ttls
+
+        if not os.path.isdir(path):
+            os.makedirs(path)
+
+    def _file_path(self, endpoint, key):
+        return os.path.join(self.path, '%s-%s.json' % (endpoint, hashlib.sha1(key.encode('utf-8')).hexdigest()))
+
+    def get(self, endpoint, key):
+        """
+        Return a cached response if it is younger than its endpoint's TTL.
+        """
+        try:
+            with open(self._file_path(endpoint, key)) as f:
+                cached = json.load(f)
+        except (IOError, ValueError):
+            return None
+
+        if time.time() - cached['fetched'] > self.ttls.get(endpoint, 0):
+            return None
+
+        return cached['data']
+
+    def set(self, endpoint, key, data):
+        """
+        Store a response, writing to a temporary file first so concurrent
+        readers never see a partial file.
+        """
+        path = self._file_path(endpoint, key)
+
+        # A name of its own per write, as threads may store the same key
+        fd, temp_path = tempfile.mkstemp(dir=self.path, suffix='.tmp')
+
+        try:
+            with os.fdopen(fd, 'w') as f:
+                json.dump({ 'fetched': time.time(), 'data': data }, f)
+
+            os.rename(temp_path, path)
+        except:
+            os.remove(temp_path)
+            raise
+
+class SocialClient(object):
+    """
+    A minimal Twitter and Facebook Graph client sharing one session.
+    """
+    def __init__(self, twitter_auth, facebook_token, cache=None, session=None, twitter_url=TWITTER_API_URL, graph_url=FACEBOOK_GRAPH_URL):
+        self.twitter_auth = twitter_auth
+        self.facebook_token = facebook_token
+        self.cache = cache or ApiCache()
+        self.session = session or get_session(WORKERS)
+        self.twitter_url = twitter_url
+        self.graph_url = graph_url
+
+    def _cached(self, endpoint, key, fetch):
+        data = self.cache.get(endpoint, key)
+
+        if data is None:
+            data = fetch()
+            self.cache.set(endpoint, key, data)
+
+        return data
+
+    def tweet(self, tweet_id):
+        """
+        Get a tweet by id. The request is signed with `twitter_auth`, a
+        twitter.OAuth.
+        """
+        def fetch():
+            url = '%sstatuses/show.json' % self.twitter_url
+            query = self.twitter_auth.encode_params(url, 'GET', { 'id': tweet_id })
+            response = self.session.get('%s?%s' % (url, query), timeout=TIMEOUT)
+            response.raise_for_status()
+
+            return response.json()
+
+        return self._cached('twitter_status', tweet_id, fetch)
+
+    def graph(self, endpoint, path, **params):
+        """
+        Get an object from the Facebook Graph API.
+        """
+        def fetch():
+            params['access_token'] = self.facebook_token
+            response = self.session.get(self.graph_url + path, params=params, timeout=TIMEOUT)
+            response.raise_for_status()
+
+            return response.json()
+
+        return self._cached(endpoint, path, fetch)
+
+def fetch_featured(client, tweet_ids, facebook_ids, workers=WORKERS):
+    """
+    Fetch featured tweets and Facebook posts concurrently.
+
+    Returns a list of raw tweets and a list of dicts holding each raw
+    post along with its author, author picture, likes and comments.
+    """
+    pool = ThreadPool(workers)
+
+    try:
+        # Everything that only needs the ids from the copy
+        jobs = [(client.tweet, (tweet_id,), {}) for tweet_id in tweet_ids]
+
+        for fb_id in facebook_ids:
+            jobs.append((client.graph, ('facebook_post', fb_id), {}))
+            jobs.append((client.graph, ('facebook_likes', '%s/likes' % fb_id), { 'summary': 'true' }))
+            jobs.append((client.graph, ('facebook_comments', '%s/comments' % fb_id), { 'summary': 'true' }))
+
+        results = pool.map(_call, jobs)
+
+        tweets = results[:len(tweet_ids)]
+        posts = []
+
+        for i, fb_id in enumerate(facebook_ids):
+            post, likes, comments = results[len(tweet_ids) + i * 3:len(tweet_ids) + i * 3 + 3]
+            posts.append({
+                'post': post,
+                'likes': likes,
+                'comments': comments
+            })
+
+        # Then the authors of each post, once per author
+        author_ids = []
+
+        for post in posts:
+            author_id = post['post']['from']['id']
+
+            if author_id not in author_ids:
+                author_ids.append(author_id)
+
+        jobs = []
+
+        for author_id in author_ids:
+            jobs.append((client.graph, ('facebook_user', author_id), {}))
+            jobs.append((client.graph, ('facebook_picture', '%s/picture' % author_id), { 'redirect': 'false' }))
+
+        results = pool.map(_call, jobs)
+    finally:
+        pool.close()
+        pool.join()
+
+    for post in posts:
+        i = author_ids.index(post['post']['from']['id'])
+        post['user'] = results[i * 2]
+        post['user_picture'] = results[i * 2 + 1]['data']
+
+    return tweets, posts
+
+def _call(job):
+    f, args, kwargs = job
+
+    return f(*args, **kwargs)
+
+def link_tweet_entities(tweet, tweet_url):
+    """
+    Replace the media, urls and hashtags in a tweet's text with links.
+
+    Entities are spliced in by their `indices` in a single pass, so one
+    entity's text appearing inside another's is never replaced twice.
+    """
+    text = tweet['text']
+    entities = tweet['entities']
+    links = []
+
+    for media in entities.get('media', []):
+        links.append((media['indices'], LINK_TEMPLATE % (media['url'], app_config.PROJECT_SLUG, 'link', tweet_url, media['display_url'])))
+
+    for url in entities.get('urls', []):
+        links.append((url['indices'], LINK_TEMPLATE % (url['url'], app_config.PROJECT_SLUG, 'link', tweet_url, url['display_url'])))
+
+    for hashtag in entities.get('hashtags', []):
+        links.append((hashtag['indices'], LINK_TEMPLATE % ('https://twitter.com/hashtag/%s' % hashtag['text'], app_config.PROJECT_SLUG, 'hashtag', tweet_url, '#%s' % hashtag['text'])))
+
+    links.sort(key=lambda link: link[0][0])
+    offsets = _string_offsets(text)
+
+    html = []
+    position = 0
+
+    for (start, end), link in links:
+        start = offsets[start] if offsets else start
+        end = offsets[end] if offsets else end
+
+        # Skip entities overlapping one already linked
+        if start < position:
+            continue
+
+        html.append(text[position:start])
+        html.append(link)
+        position = end
+
+    html.append(text[position:])
+
+    return u''.join(html)
+
+def _string_offsets(text):
+    """
+    Twitter counts offsets in code points, but narrow Python builds store
+    characters outside the BMP as two code units. Returns a list mapping
+    code point offsets to string offsets, or None if they are the same.
+    """
+    if sys.maxunicode > 0xFFFF or not any(u'\ud800' <= c <= u'\udbff' for c in text):
+        return None
+
+    offsets = []
+    i = 0
+
+    while i < len(text):
+        offsets.append(i)
+        i += 2 if u'\ud800' <= text[i] <= u'\udbff' else 1
+
+    offsets.append(i)
+
+    return offsets
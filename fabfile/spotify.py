@@ -0,0 +1,113 @@
+#!/usr/bin/env python
+
+"""
+Resolve Spotify track ids in batches.
+
+Tracks are looked up through the multi-track endpoint and the fields we
+use are cached on disk by track id, so rerunning only resolves ids that
+have not been seen before. Ids that fail are not cached and are retried
+on the next run.
+"""
+
+import json
+import os
+
+from spotipy import SpotifyException
+
+CACHE_PATH = '.spotify-cache.json'
+REPORT_PATH = 'data/spotify-report.json'
+
+# The most ids the tracks endpoint accepts at once
+BATCH_SIZE = 50
+
+def track_id(value):
+    """
+    Get the bare id from a Spotify track id, URI or URL.
+    """
+    value = value.strip().split('?')[0].rstrip('/')
+
+    if '/' in value:
+        return value.split('/')[-1]
+
+    return value.split(':')[-1]
+
+def resolve_tracks(sp, track_ids, cache_path=CACHE_PATH, batch_size=BATCH_SIZE):
+    """
+    Look up tracks with a spotipy.Spotify client.
+
+    Returns a dict of track id to cached track fields and a list of ids
+    that could not be resolved.
+    """
+    cache = _read_cache(cache_path)
+    to_resolve = []
+
+    for id in track_ids:
+        if id not in cache and id not in to_resolve:
+            to_resolve.append(id)
+
+    print 'Resolving %i Spotify tracks (%i cached)' % (len(to_resolve), len(set(track_ids)) - len(to_resolve))
+
+    failed = []
+
+    for i in range(0, len(to_resolve), batch_size):
+        batch = to_resolve[i:i + batch_size]
+
+        for id, track in zip(batch, _fetch_batch(sp, batch)):
+            if track:
+                cache[id] = {
+                    'uri': track['uri'],
+                    'name': track['name'],
+                    'track_number': track['track_number']
+                }
+            else:
+                failed.append(id)
+
+    if to_resolve:
+        _write_cache(cache, cache_path)
+
+    return dict((id, cache[id]) for id in track_ids if id in cache), failed
+
+def _fetch_batch(sp, batch):
+    """
+    Fetch a batch of tracks, returning None in place of any that failed.
+
+    Spotify rejects a whole request if any id in it is malformed, so a
+    failed batch is retried one id at a time to find the bad ones.
+    """
+    try:
+        return sp.tracks(batch)['tracks']
+    except SpotifyException:
+        if len(batch) == 1:
+            return [None]
+
+    return [_fetch_batch(sp, [id])[0] for id in batch]
+
+def write_report(failed, report_path=REPORT_PATH):
+    """
+    Print and write the ids that could not be resolved.
+    """
+    for id in failed:
+        print '--> invalid Spotify ID: %s' % id
+
+    with open(report_path, 'w') as f:
+        json.dump({ 'failed': failed }, f, indent=4)
+
+def _read_cache(cache_path):
+    """
+    Read resolved tracks from disk.
+    """
+    if not os.path.isfile(cache_path):
+        return {}
+
+    try:
+        with open(cache_path) as f:
+            return json.load(f)
+    except ValueError:
+        return {}
+
+def _write_cache(cache, cache_path):
+    """
+    Write resolved tracks to disk.
+    """
+    with open(cache_path, 'w') as f:
+        json.dump(cache, f)
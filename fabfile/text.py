@@ -5,6 +5,7 @@ Commands related to syncing copytext from Google Docs.
 """
 
 import app_config
+import copy_cache
 import os
 
 from fabric.api import task
@@ -14,7 +15,7 @@ from termcolor import colored
 @task(default=True)
 def update():
     """
-    Downloads a Google Doc as an Excel file.
+    Downloads a Google Doc as an Excel file and compiles its snapshot.
     """
     if app_config.COPY_GOOGLE_DOC_KEY == None:
         print colored('You have set COPY_GOOGLE_DOC_KEY to None. If you want to use a Google Sheet, set COPY_GOOGLE_DOC_KEY  to the key of your sheet in app_config.py', 'blue')
@@ -27,3 +28,13 @@ def update():
         return
 
     get_document(app_config.COPY_GOOGLE_DOC_KEY, app_config.COPY_PATH)
+    snapshot()
+
+@task
+def snapshot():
+    """
+    Compile the copy spreadsheet into a fast-loading snapshot.
+    """
+    copy_cache.write_snapshot(app_config.COPY_PATH)
+
+    print 'Wrote %s and %s' % copy_cache.snapshot_paths(app_config.COPY_PATH)
@@ -5,9 +5,16 @@ Utilities used by multiple commands.
 """
 
 import boto
+import gzip
+import json
+import os
+import requests
+import tempfile
 
 from boto.s3.connection import OrdinaryCallingFormat
 from fabric.api import prompt
+from gzip_utils import gzip_path, has_fresh_gzip
+from requests.adapters import HTTPAdapter
 
 
 def confirm(message):
@@ -40,3 +47,73 @@ def get_bucket(bucket_name):
 
     return s3.get_bucket(bucket_name)
 
+
+def get_session(workers=1):
+    """
+    Create an HTTP session whose connection pool can serve every worker.
+    """
+    session = requests.Session()
+    adapter = HTTPAdapter(pool_connections=1, pool_maxsize=workers)
+    session.mount('http://', adapter)
+    session.mount('https://', adapter)
+
+    return session
+
+
+def write_json(path, items, compress=True):
+    """
+    Write a list as compact JSON, encoding one item at a time.
+
+    With `compress`, a maximally compressed .gz sibling is written in the
+    same pass. Both files are written to temporary names and renamed into
+    place once complete, the sibling last so it is never older than the
+    file it compresses.
+    """
+    encoder = json.JSONEncoder(separators=(',', ':'))
+    dirname = os.path.dirname(path) or '.'
+
+    fd, temp_path = tempfile.mkstemp(dir=dirname, suffix='.tmp')
+    outputs = [os.fdopen(fd, 'wb')]
+    temp_paths = [temp_path]
+
+    if compress:
+        fd, temp_gzip_path = tempfile.mkstemp(dir=dirname, suffix='.gz.tmp')
+        raw = os.fdopen(fd, 'wb')
+        # A fixed name and mtime keep the output identical between runs
+        outputs.append(gzip.GzipFile(filename=os.path.basename(path), mode='wb', fileobj=raw, compresslevel=9, mtime=0))
+        temp_paths.append(temp_gzip_path)
+
+    def write(chunk):
+        for output in outputs:
+            output.write(chunk)
+
+    try:
+        write('[')
+
+        for i, item in enumerate(items):
+            if i:
+                write(',')
+
+            for chunk in encoder.iterencode(item):
+                write(chunk)
+
+        write(']')
+
+        for output in outputs:
+            output.close()
+
+        if compress:
+            raw.close()
+    except:
+        for temp_path in temp_paths:
+            os.remove(temp_path)
+        raise
+
+    # mkstemp creates files only the owner can read
+    for temp_path in temp_paths:
+        os.chmod(temp_path, 0644)
+
+    os.rename(temp_paths[0], path)
+
+    if compress:
+        os.rename(temp_paths[1], gzip_path(path))
@@ -0,0 +1,162 @@
+#!/usr/bin/env python
+
+"""
+Commands that verify song media links.
+"""
+
+import json
+import os
+import time
+
+import requests
+
+from fabric.api import task
+from multiprocessing.pool import ThreadPool
+from utils import get_session
+
+AUDIO_URL_TEMPLATE = 'http://pd.npr.org/anon.npr-mp3%s.mp3'
+
+CACHE_PATH = '.verify-cache.json'
+REPORT_PATH = 'data/verify-report.json'
+
+# Successful checks are trusted for a day
+CACHE_TTL = 60 * 60 * 24
+WORKERS = 8
+TIMEOUT = 10
+
+@task(default=True)
+def links(workers=WORKERS, ttl=CACHE_TTL):
+    """
+    Verify the audio link of every song in data/songs.json.
+    """
+    with open('data/songs.json') as f:
+        songs = json.load(f)
+
+    verify_links(songs, int(workers), int(ttl))
+
+def verify_links(songs, workers=WORKERS, ttl=CACHE_TTL):
+    """
+    HEAD each unique audio URL with a bounded pool of workers sharing
+    one pooled session. Results younger than `ttl` seconds are read from
+    the on-disk cache instead of being re-checked.
+
+    Returns a report with one entry per unique media_url and writes it
+    to REPORT_PATH.
+    """
+    cache = _read_cache()
+    now = time.time()
+
+    media_urls = []
+    seen = set()
+
+    for song in songs:
+        if song['media_url'] not in seen:
+            seen.add(song['media_url'])
+            media_urls.append(song['media_url'])
+
+    report = []
+    to_check = []
+
+    for media_url in media_urls:
+        cached = cache.get(media_url)
+
+        if cached and now - cached['checked'] < ttl:
+            report.append(dict(cached, cached=True))
+        else:
+            to_check.append(media_url)
+
+    print 'Verifying %i audio links (%i cached)' % (len(to_check), len(report))
+
+    if to_check:
+        session = get_session(workers)
+        pool = ThreadPool(min(workers, len(to_check)))
+
+        try:
+            results = pool.map(lambda media_url: _check_link(session, media_url), to_check)
+        finally:
+            pool.close()
+            pool.join()
+
+        for result in results:
+            # Only cache good links so broken ones are retried next run
+            if result['status'] == 200:
+                cache[result['media_url']] = result
+
+            report.append(dict(result, cached=False))
+
+        _write_cache(cache)
+
+    # Keep report order stable between runs
+    order = dict((media_url, i) for i, media_url in enumerate(media_urls))
+    report.sort(key=lambda result: order[result['media_url']])
+
+    with open(REPORT_PATH, 'w') as f:
+        json.dump(report, f, indent=4)
+
+    _print_report(report)
+
+    return report
+
+def _check_link(session, media_url):
+    """
+    HEAD a single audio link.
+    """
+    url = AUDIO_URL_TEMPLATE % media_url
+    result = {
+        'media_url': media_url,
+        'url': url,
+        'status': None,
+        'latency': None,
+        'checked': time.time()
+    }
+
+    start = time.time()
+
+    try:
+        response = session.head(url, timeout=TIMEOUT)
+        result['status'] = response.status_code
+    except requests.RequestException as e:
+        result['error'] = unicode(e)
+
+    result['latency'] = round(time.time() - start, 3)
+
+    return result
+
+def _print_report(report):
+    """
+    Print a summary of a verification report.
+    """
+    failed = [result for result in report if result['status'] != 200]
+
+    for result in failed:
+        if result['status'] is None:
+            print '--> request.head failed: %s (%s)' % (result['url'], result.get('error'))
+        else:
+            print '--> %s The audio URL is invalid: %s' % (result['status'], result['url'])
+
+    checked = [result['latency'] for result in report if not result['cached'] and result['latency'] is not None]
+
+    if checked:
+        print 'Checked %i links, mean latency %.3fs' % (len(checked), sum(checked) / len(checked))
+
+    print '%i of %i audio links are valid' % (len(report) - len(failed), len(report))
+
+def _read_cache():
+    """
+    Read verification results from disk.
+    """
+    if not os.path.isfile(CACHE_PATH):
+        return {}
+
+    try:
+        with open(CACHE_PATH) as f:
+            return json.load(f)
+    except ValueError:
+        return {}
+
+def _write_cache(cache):
+    """
+    Write verification results to disk.
+    """
+    with open(CACHE_PATH, 'w') as f:
+        json.dump(cache, f)
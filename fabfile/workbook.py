@@ -0,0 +1,53 @@
+#!/usr/bin/env python
+
+"""
+Stream rows out of a spreadsheet without loading the whole workbook.
+
+Rows are read with openpyxl's read-only reader, one at a time, and
+normalized for the data pipeline the way copytext's serialized sheets
+were used: columns end at the first empty header cell, values are
+unicode, empty cells are u'' and empty rows are skipped.
+"""
+
+from collections import OrderedDict
+from openpyxl import load_workbook
+
+class WorkbookException(Exception):
+    pass
+
+def iter_rows(path, sheet_name):
+    """
+    Yield the spreadsheet row number and an OrderedDict of each row of
+    a sheet.
+    """
+    try:
+        book = load_workbook(path, read_only=True, data_only=True)
+    except IOError:
+        raise WorkbookException('"%s" does not exist. Have you run "fab data.update"?' % path)
+
+    try:
+        if sheet_name not in book.get_sheet_names():
+            raise WorkbookException('"%s" has no sheet named "%s"' % (path, sheet_name))
+
+        rows = book.get_sheet_by_name(sheet_name).iter_rows()
+        columns = []
+
+        for cell in next(rows, ()):
+            if cell.value is None:
+                break
+
+            columns.append(unicode(cell.value))
+
+        for row_number, cells in enumerate(rows, 2):
+            values = [u'' if cell.value is None else unicode(cell.value) for cell in cells[:len(columns)]]
+            values.extend([u''] * (len(columns) - len(values)))
+
+            if not any(values):
+                continue
+
+            yield row_number, OrderedDict(zip(columns, values))
+    finally:
+        archive = getattr(book, '_archive', None)
+
+        if archive:
+            archive.close()
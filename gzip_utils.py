@@ -0,0 +1,23 @@
+#!/usr/bin/env python
+
+"""
+Precompressed .gz siblings of static files, shared by the data pipeline
+that writes them and the server that sends them.
+"""
+
+import os
+
+def gzip_path(path):
+    """
+    Get the path of a file's precompressed sibling.
+    """
+    return '%s.gz' % path
+
+def has_fresh_gzip(path):
+    """
+    Check a file has a precompressed sibling at least as new as itself.
+    """
+    try:
+        return os.path.getmtime(gzip_path(path)) >= os.path.getmtime(path)
+    except OSError:
+        return False
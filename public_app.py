@@ -6,6 +6,7 @@ import json
 import logging
 import static
 
+from conditional import COPY_PATHS, TEMPLATES_PATH, app_config_version, conditional
 from flask import Flask, make_response, render_template
 from render_utils import make_context, smarty_filter, urlencode_filter
 from werkzeug.debug import DebuggedApplication
@@ -35,6 +36,7 @@ def _test_app():
 
 # Example of rendering index.html with public_app 
 @app.route ('/%s/' % app_config.PROJECT_SLUG, methods=['GET'])
+@conditional(['data/featured.json', TEMPLATES_PATH] + COPY_PATHS, app_config_version)
 def index():
     """
     Example view rendering a simple page.
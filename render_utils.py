@@ -4,15 +4,15 @@ import codecs
 from datetime import datetime
 import json
 import time
-import urllib
 import subprocess
 
 from flask import Markup, g, render_template, request
 from slimit import minify
-from smartypants import smartypants
 
 import app_config
+import copy_cache
 import copytext
+import typography
 
 class BetterJSONEncoder(json.JSONEncoder):
     """
@@ -176,7 +176,7 @@ def make_context(asset_depth=0):
     context = flatten_app_config()
 
     try:
-        context['COPY'] = copytext.Copy(app_config.COPY_PATH)
+        context['COPY'] = copy_cache.get_copy()
     except copytext.CopyException:
         pass
 
@@ -189,38 +189,27 @@ def urlencode_filter(s):
     """
     Filter to urlencode strings.
     """
-    if type(s) == 'Markup':
-        s = s.unescape()
-
-    # Evaulate COPY elements
-    if type(s) is not unicode:
-        s = unicode(s)
-
-    s = s.encode('utf8')
-    s = urllib.quote_plus(s)
-
-    return Markup(s)
+    return Markup(typography.urlencode(s))
 
 def smarty_filter(s):
     """
     Filter to smartypants strings.
     """
-    if type(s) == 'Markup':
-        s = s.unescape()
-
-    # Evaulate COPY elements
-    if type(s) is not unicode:
-        s = unicode(s)
+    return Markup(typography.smartypants(s))
 
+def srcset_filter(cover, image_format='JPEG'):
+    """
+    Build a srcset from a data/covers.json entry for one image format.
+    """
+    if not cover:
+        return ''
 
-    s = s.encode('utf-8')
-    s = smartypants(s)
+    derivatives = sorted(
+        [d for d in cover['derivatives'] if d['format'] == image_format],
+        key=lambda d: d['width']
+    )
 
-    try:
-        return Markup(s)
-    except:
-        print 'This string failed to encode: %s' % s
-        return Markup(s)
+    return ', '.join(['%s %iw' % (d['path'], d['width']) for d in derivatives])
 
 def format_time_filter(s):
     """
@@ -0,0 +1,344 @@
+#!/usr/bin/env python
+
+"""
+A compact, columnar form of data/songs.json for the server.
+
+Every string is stored once in a string table and each field of the
+songs becomes a column of string ids, flags or offsets. Reviews are kept
+in a column of their own. The loader memory-maps the file, so workers
+share its pages and only decode the fields a template actually reads.
+"""
+
+import json
+import mmap
+import numpy
+import os
+import struct
+import tempfile
+
+PATH = 'data/songs.idx'
+
+MAGIC = 'SONGIDX1'
+VERSION = 1
+
+# String id of a missing value
+NONE = 0xFFFFFFFF
+
+ALIGNMENT = 8
+
+class _StringTable(object):
+    """
+    Interns strings, assigning each unique string an id.
+    """
+    def __init__(self):
+        self.ids = {}
+        self.strings = []
+
+    def add(self, s):
+        if s is None:
+            return NONE
+
+        if not isinstance(s, unicode):
+            s = s.decode('utf-8')
+
+        id = self.ids.get(s)
+
+        if id is None:
+            id = self.ids[s] = len(self.strings)
+            self.strings.append(s)
+
+        return id
+
+def _column_kind(values):
+    """
+    Pick the storage for a column from its values.
+    """
+    present = [v for v in values if v is not None]
+
+    if present and all(isinstance(v, bool) for v in values):
+        return 'bool'
+
+    if all(isinstance(v, basestring) for v in present):
+        return 'string'
+
+    if all(isinstance(v, list) and all(isinstance(s, basestring) for s in v) for v in present):
+        return 'strings'
+
+    if all(isinstance(v, list) and all(isinstance(r, dict) for r in v) for v in present):
+        return 'records'
+
+    return 'json'
+
+def _offsets(lists):
+    """
+    Start offsets of each list in their concatenation, plus the total.
+    """
+    offsets = numpy.zeros(len(lists) + 1, dtype='<u4')
+    offsets[1:] = numpy.cumsum([len(l) for l in lists])
+
+    return offsets
+
+def _build_columns(rows, strings):
+    """
+    Build the arrays for each field of a list of dicts. Returns a list of
+    column descriptions, each with a dict of named arrays.
+    """
+    names = []
+    seen = set()
+
+    for row in rows:
+        for name in row:
+            if name not in seen:
+                seen.add(name)
+                names.append(name)
+
+    columns = []
+
+    for name in names:
+        values = [row.get(name) for row in rows]
+        kind = _column_kind(values)
+        column = { 'name': name, 'kind': kind, 'arrays': {} }
+
+        if kind == 'bool':
+            column['arrays']['values'] = numpy.array([bool(v) for v in values], dtype='u1')
+        elif kind == 'string':
+            column['arrays']['values'] = numpy.array([strings.add(v) for v in values], dtype='<u4')
+        elif kind == 'json':
+            column['arrays']['values'] = numpy.array([strings.add(None if v is None else json.dumps(v)) for v in values], dtype='<u4')
+        elif kind == 'strings':
+            lists = [v or [] for v in values]
+            column['arrays']['offsets'] = _offsets(lists)
+            column['arrays']['values'] = numpy.array([strings.add(s) for l in lists for s in l], dtype='<u4')
+        elif kind == 'records':
+            lists = [v or [] for v in values]
+            column['arrays']['offsets'] = _offsets(lists)
+            column['fields'] = _build_columns([r for l in lists for r in l], strings)
+
+        columns.append(column)
+
+    return columns
+
+def write_index(songs, path=PATH):
+    """
+    Write songs to a columnar index, atomically.
+    """
+    strings = _StringTable()
+    columns = _build_columns(songs, strings)
+
+    encoded = [s.encode('utf-8') for s in strings.strings]
+    string_offsets = _offsets(encoded)
+
+    # Arrays follow the header, each aligned. Offsets are relative to the
+    # end of the header so the header never depends on its own size.
+    arrays = []
+    size = [0]
+
+    def place(data, dtype, count):
+        position = _align(size[0])
+        arrays.append('\0' * (position - size[0]))
+        arrays.append(data)
+        size[0] = position + len(data)
+
+        return [position, dtype, count]
+
+    def layout(columns):
+        described = []
+
+        for column in columns:
+            description = { 'name': column['name'], 'kind': column['kind'], 'arrays': {} }
+
+            for key, array in sorted(column['arrays'].items()):
+                description['arrays'][key] = place(array.tostring(), array.dtype.str, len(array))
+
+            if 'fields' in column:
+                description['fields'] = layout(column['fields'])
+
+            described.append(description)
+
+        return described
+
+    header = json.dumps({
+        'version': VERSION,
+        'count': len(songs),
+        'columns': layout(columns),
+        'string_offsets': place(string_offsets.tostring(), string_offsets.dtype.str, len(string_offsets)),
+        'string_data': place(''.join(encoded), '|u1', len(''.join(encoded)))
+    })
+
+    fd, temp_path = tempfile.mkstemp(dir=os.path.dirname(path) or '.', suffix='.tmp')
+
+    try:
+        with os.fdopen(fd, 'wb') as f:
+            f.write(MAGIC)
+            f.write(struct.pack('<I', len(header)))
+            f.write(header)
+            f.write('\0' * (_data_start(len(header)) - f.tell()))
+
+            for data in arrays:
+                f.write(data)
+
+        # mkstemp creates files only the owner can read
+        os.chmod(temp_path, 0644)
+        os.rename(temp_path, path)
+    except:
+        os.remove(temp_path)
+        raise
+
+def _data_start(header_size):
+    return _align(len(MAGIC) + 4 + header_size)
+
+def _align(position):
+    return (position + ALIGNMENT - 1) // ALIGNMENT * ALIGNMENT
+
+class SongIndex(object):
+    """
+    A memory-mapped song index. Behaves as a sequence of SongRecords.
+    """
+    def __init__(self, path=PATH):
+        with open(path, 'rb') as f:
+            self._mmap = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+
+        if self._mmap[:len(MAGIC)] != MAGIC:
+            raise ValueError('%s is not a song index' % path)
+
+        start = len(MAGIC) + 4
+        header_size = struct.unpack('<I', self._mmap[len(MAGIC):start])[0]
+        header = json.loads(self._mmap[start:start + header_size])
+
+        if header['version'] != VERSION:
+            raise ValueError('%s is version %i, expected %i' % (path, header['version'], VERSION))
+
+        self._data_start = _data_start(header_size)
+        self._count = header['count']
+        self._string_offsets = self._array(header['string_offsets'])
+        self._string_start = self._data_start + header['string_data'][0]
+        self._strings = {}
+        self._columns = self._map_columns(header['columns'])
+        self.fields = [column['name'] for column in header['columns']]
+
+    def _array(self, description):
+        offset, dtype, count = description
+
+        return numpy.frombuffer(self._mmap, dtype=dtype, count=count, offset=self._data_start + offset)
+
+    def _map_columns(self, columns):
+        mapped = {}
+
+        for column in columns:
+            mapped[column['name']] = {
+                'kind': column['kind'],
+                'arrays': dict((key, self._array(description)) for key, description in column['arrays'].items()),
+                'fields': self._map_columns(column.get('fields', [])),
+                'keys': [field['name'] for field in column.get('fields', [])]
+            }
+
+        return mapped
+
+    def string(self, id):
+        """
+        Decode a string from the table. Decoded strings are kept, so
+        each is only decoded once.
+        """
+        if id == NONE:
+            return None
+
+        s = self._strings.get(id)
+
+        if s is None:
+            start = self._string_start + int(self._string_offsets[id])
+            end = self._string_start + int(self._string_offsets[id + 1])
+            s = self._strings[id] = self._mmap[start:end].decode('utf-8')
+
+        return s
+
+    def _value(self, column, i):
+        kind = column['kind']
+        arrays = column['arrays']
+
+        if kind == 'bool':
+            return bool(arrays['values'][i])
+
+        if kind == 'string':
+            return self.string(arrays['values'][i])
+
+        if kind == 'json':
+            value = self.string(arrays['values'][i])
+
+            return None if value is None else json.loads(value)
+
+        start, end = arrays['offsets'][i], arrays['offsets'][i + 1]
+
+        if kind == 'strings':
+            return [self.string(id) for id in arrays['values'][start:end]]
+
+        return [dict((key, self._value(column['fields'][key], j)) for key in column['keys']) for j in range(start, end)]
+
+    def value(self, key, i):
+        """
+        Get one field of one song.
+        """
+        return self._value(self._columns[key], i)
+
+    def column(self, key):
+        """
+        Get one field of every song, in order.
+        """
+        column = self._columns[key]
+
+        return [self._value(column, i) for i in range(self._count)]
+
+    def __len__(self):
+        return self._count
+
+    def __getitem__(self, i):
+        if i < 0:
+            i += self._count
+
+        if not 0 <= i < self._count:
+            raise IndexError(i)
+
+        return SongRecord(self, i)
+
+    def __iter__(self):
+        for i in range(self._count):
+            yield SongRecord(self, i)
+
+    def close(self):
+        self._mmap.close()
+
+class SongRecord(object):
+    """
+    A read-only view of one song, usable like the dicts in songs.json.
+    """
+    __slots__ = ('_index', '_i')
+
+    def __init__(self, index, i):
+        self._index = index
+        self._i = i
+
+    def __getitem__(self, key):
+        if key not in self._index._columns:
+            raise KeyError(key)
+
+        return self._index.value(key, self._i)
+
+    def __contains__(self, key):
+        return key in self._index._columns
+
+    def __iter__(self):
+        return iter(self._index.fields)
+
+    def get(self, key, default=None):
+        if key not in self._index._columns:
+            return default
+
+        return self._index.value(key, self._i)
+
+    def keys(self):
+        return list(self._index.fields)
+
+    def to_dict(self):
+        return dict((key, self[key]) for key in self._index.fields)
+
+    def __repr__(self):
+        return '<SongRecord %s>' % self.get('id')
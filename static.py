@@ -6,16 +6,27 @@ import os
 import subprocess
 
 from flask import abort, make_response
+from werkzeug.datastructures import ContentRange
+from werkzeug.wrappers import Response
+from werkzeug.wsgi import wrap_file
 
-import app_config
-import copytext
+import copy_cache
+from conditional import COPY_PATHS, app_config_version, conditional, get_validators, is_not_modified
 from flask import Blueprint
+from gzip_utils import gzip_path, has_fresh_gzip
 from render_utils import BetterJSONEncoder, flatten_app_config
 
 static = Blueprint('static', __name__)
 
+# Static files are served from here
+STATIC_PATH = 'www'
+
+# Static files are streamed in blocks of this many bytes
+BLOCK_SIZE = 64 * 1024
+
 # Render JST templates on-demand
 @static.route('/js/templates.js')
+@conditional(['jst'])
 def _templates_js():
     r = subprocess.check_output(["node_modules/universal-jst/bin/jst.js", "--template", "underscore", "jst"])
 
@@ -23,6 +34,7 @@ def _templates_js():
 
 # Render LESS files on-demand
 @static.route('/less/<string:filename>')
+@conditional(['less'])
 def _less(filename):
     if not os.path.exists('less/%s' % filename):
         abort(404)
@@ -33,6 +45,7 @@ def _less(filename):
 
 # Render application configuration
 @static.route('/js/app_config.js')
+@conditional([], app_config_version)
 def _app_config_js():
     config = flatten_app_config()
     js = 'window.APP_CONFIG = ' + json.dumps(config, cls=BetterJSONEncoder)
@@ -41,16 +54,114 @@ def _app_config_js():
 
 # Render copytext
 @static.route('/js/copy.js')
+@conditional(COPY_PATHS)
 def _copy_js():
-    copy = 'window.COPY = ' + copytext.Copy(app_config.COPY_PATH).json()
+    copy = copy_cache.get_copy_js()
 
     return make_response(copy, 200, { 'Content-Type': 'application/javascript' })
 
 # Server arbitrary static files on-demand
 @static.route('/<path:path>')
 def _static(path):
+    # Imported here so no request proxy is a module global, which breaks
+    # Fabric's task discovery
+    from flask import request
+
+    path = os.path.join(STATIC_PATH, path)
+    headers = { 'Content-Type': _guess_type(path), 'Accept-Ranges': 'bytes' }
+
+    # Serve precompressed siblings to clients that accept them
+    if has_fresh_gzip(path):
+        headers['Vary'] = 'Accept-Encoding'
+
+        if 'gzip' in request.headers.get('Accept-Encoding', ''):
+            path = gzip_path(path)
+            headers['Content-Encoding'] = 'gzip'
+
     try:
-        with open('www/%s' % path) as f:
-            return make_response(f.read(), 200, { 'Content-Type': guess_type(path)[0] })
+        f = open(path, 'rb')
     except IOError:
         abort(404)
+
+    size = os.fstat(f.fileno()).st_size
+    etag, last_modified = get_validators('_static', [path])
+    byte_range = _requested_range(etag, last_modified)
+
+    if is_not_modified(etag, last_modified):
+        f.close()
+        response = Response(status=304)
+    elif byte_range is None:
+        # Let the server send the file itself where it can
+        headers['Content-Length'] = str(size)
+        response = Response(wrap_file(request.environ, f, BLOCK_SIZE), 200, headers, direct_passthrough=True)
+    else:
+        span = byte_range.range_for_length(size)
+
+        if span is None:
+            f.close()
+            response = Response(status=416, headers={ 'Content-Range': 'bytes */%i' % size })
+        else:
+            start, stop = span
+            headers['Content-Length'] = str(stop - start)
+            headers['Content-Range'] = str(ContentRange('bytes', start, stop, size))
+            response = Response(_read_range(f, start, stop), 206, headers, direct_passthrough=True)
+
+    response.set_etag(etag)
+    response.last_modified = last_modified
+
+    return response
+
+def _requested_range(etag, last_modified):
+    """
+    Get the single byte range requested, unless an If-Range no longer
+    matches the file. Requests for several ranges get the whole file.
+    """
+    from flask import request
+
+    byte_range = request.range
+
+    if byte_range is None or byte_range.units != 'bytes' or len(byte_range.ranges) != 1:
+        return None
+
+    if_range = request.if_range
+
+    if if_range.etag is not None and if_range.etag != etag:
+        return None
+
+    if if_range.date is not None and if_range.date != last_modified:
+        return None
+
+    return byte_range
+
+def _read_range(f, start, stop):
+    """
+    Yield the bytes of a file from `start` to `stop` in blocks.
+    """
+    try:
+        f.seek(start)
+        remaining = stop - start
+
+        while remaining > 0:
+            block = f.read(min(BLOCK_SIZE, remaining))
+
+            if not block:
+                break
+
+            remaining -= len(block)
+
+            yield block
+    finally:
+        f.close()
+
+_content_types = {}
+
+def _guess_type(path):
+    """
+    Guess the content type of a file, once per extension.
+    """
+    extension = os.path.splitext(path)[1].lower()
+
+    if extension not in _content_types:
+        _content_types[extension] = guess_type('file%s' % extension)[0] or 'application/octet-stream'
+
+    return _content_types[extension]
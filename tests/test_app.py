@@ -1,10 +1,17 @@
 #!/usr/bin/env python
 
+import gzip
 import json
+import os
+import shutil
+import tempfile
 import unittest
 
 import app
 import app_config
+import data_cache
+import song_index
+import static
 
 class IndexTestCase(unittest.TestCase):
     """
@@ -51,5 +58,107 @@ class AppConfigTestCase(unittest.TestCase):
         
         app_config.configure_targets('staging')
 
+class StaticTestCase(unittest.TestCase):
+    """
+    Test serving static files and their precompressed siblings.
+    """
+    def setUp(self):
+        app.app.config['TESTING'] = True
+        self.client = app.app.test_client()
+
+        # Serve from a temporary root rather than the real www/
+        self.static_path = static.STATIC_PATH
+        static.STATIC_PATH = tempfile.mkdtemp()
+        self.path = os.path.join(static.STATIC_PATH, 'test-static.json')
+
+        with open(self.path, 'w') as f:
+            f.write('[1,2,3]')
+
+    def tearDown(self):
+        shutil.rmtree(static.STATIC_PATH)
+        static.STATIC_PATH = self.static_path
+
+    def test_plain(self):
+        response = self.client.get('/test-static.json', headers={ 'Accept-Encoding': 'gzip' })
+
+        assert response.data == '[1,2,3]'
+        assert 'Content-Encoding' not in response.headers
+
+    def test_gzip(self):
+        with gzip.open('%s.gz' % self.path, 'wb') as f:
+            f.write('[1,2,3]')
+
+        response = self.client.get('/test-static.json', headers={ 'Accept-Encoding': 'gzip, deflate' })
+
+        assert response.headers['Content-Encoding'] == 'gzip'
+        assert response.headers['Vary'] == 'Accept-Encoding'
+        assert response.data.startswith('\x1f\x8b')
+
+        response = self.client.get('/test-static.json')
+
+        assert response.data == '[1,2,3]'
+
+    def test_range(self):
+        response = self.client.get('/test-static.json', headers={ 'Range': 'bytes=1-3' })
+
+        assert response.status_code == 206
+        assert response.data == '1,2'
+        assert response.headers['Content-Range'] == 'bytes 1-3/7'
+        assert response.headers['Content-Length'] == '3'
+
+        response = self.client.get('/test-static.json', headers={ 'Range': 'bytes=-2', 'If-Range': '"stale"' })
+
+        assert response.status_code == 200
+        assert response.data == '[1,2,3]'
+
+        response = self.client.get('/test-static.json', headers={ 'Range': 'bytes=10-' })
+
+        assert response.status_code == 416
+        assert response.headers['Content-Range'] == 'bytes */7'
+
+    def test_not_modified(self):
+        response = self.client.get('/test-static.json')
+
+        assert response.headers['Content-Type'] == 'application/json'
+        assert response.headers['Content-Length'] == '7'
+
+        response = self.client.get('/test-static.json', headers={ 'If-None-Match': response.headers['ETag'] })
+
+        assert response.status_code == 304
+        assert response.data == ''
+
+class CatalogTestCase(unittest.TestCase):
+    """
+    Test the sorted and grouped songs of the preview pages.
+    """
+    def setUp(self):
+        data_cache.clear()
+
+        self.path = tempfile.mkdtemp()
+        self.filename = os.path.join(self.path, 'songs.idx')
+
+        song_index.write_index([
+            { 'id': 'a', 'artist': 'The Zombies', 'genre_tags': ['rock', 'unknown'] },
+            { 'id': 'b', 'artist': 'adele', 'genre_tags': ['pop'] },
+            { 'id': 'c', 'artist': 'Beck', 'genre_tags': ['pop', 'rock'] }
+        ], self.filename)
+
+    def tearDown(self):
+        shutil.rmtree(self.path)
+
+    def test_sorted(self):
+        songs = app._sort_songs(data_cache.get(self.filename))
+
+        assert [song['id'] for song in songs] == ['b', 'c', 'a']
+
+    def test_grouped(self):
+        songs = app._sort_songs(data_cache.get(self.filename))
+        grouped = app._group_by_genre(songs, ['rock', 'pop', 'jazz'])
+
+        assert grouped.keys() == ['rock', 'pop', 'jazz']
+        assert [song['id'] for song in grouped['rock']] == ['c', 'a']
+        assert [song['id'] for song in grouped['pop']] == ['b', 'c']
+        assert grouped['jazz'] == []
+
 if __name__ == '__main__':
     unittest.main()
@@ -0,0 +1,67 @@
+#!/usr/bin/env python
+
+import os
+import shutil
+import tempfile
+import unittest
+
+import app
+import app_config
+import conditional
+
+class ConditionalTestCase(unittest.TestCase):
+    """
+    Test ETags, Last-Modified dates and 304s.
+    """
+    def setUp(self):
+        app.app.config['TESTING'] = True
+        self.client = app.app.test_client()
+        self.target = app_config.DEPLOYMENT_TARGET
+
+        self.path = tempfile.mkdtemp()
+        self.filename = os.path.join(self.path, 'data.json')
+
+        with open(self.filename, 'w') as f:
+            f.write('[]')
+
+        os.utime(self.filename, (1000, 1000))
+
+    def tearDown(self):
+        shutil.rmtree(self.path)
+        app_config.configure_targets(self.target)
+
+    def test_validators(self):
+        etag, last_modified = conditional.get_validators('view', [self.path])
+
+        assert last_modified.isoformat() == '1970-01-01T00:16:40'
+        assert conditional.get_validators('view', [self.filename])[0] == etag
+        assert conditional.get_validators('other', [self.path])[0] != etag
+        assert conditional.get_validators('view', [self.path], 'extra')[0] != etag
+
+        os.utime(self.filename, (2000, 2000))
+
+        assert conditional.get_validators('view', [self.path])[0] != etag
+
+    def test_not_modified(self):
+        response = self.client.get('/js/app_config.js')
+        etag = response.headers['ETag']
+
+        assert response.status_code == 200
+
+        response = self.client.get('/js/app_config.js', headers={ 'If-None-Match': etag })
+
+        assert response.status_code == 304
+        assert response.data == ''
+        assert response.headers['ETag'] == etag
+
+    def test_modified(self):
+        etag = self.client.get('/js/app_config.js').headers['ETag']
+
+        app_config.configure_targets('production')
+        response = self.client.get('/js/app_config.js', headers={ 'If-None-Match': etag })
+
+        assert response.status_code == 200
+        assert response.headers['ETag'] != etag
+
+if __name__ == '__main__':
+    unittest.main()
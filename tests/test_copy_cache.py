@@ -0,0 +1,84 @@
+#!/usr/bin/env python
+
+import os
+import shutil
+import tempfile
+import unittest
+
+import copytext
+from openpyxl import Workbook
+
+import copy_cache
+import data_cache
+
+class CopyCacheTestCase(unittest.TestCase):
+    """
+    Test sharing one parsed copy workbook per version.
+    """
+    def setUp(self):
+        data_cache.clear()
+        copy_cache.clear()
+
+        self.path = tempfile.mkdtemp()
+        self.filename = os.path.join(self.path, 'copy.xlsx')
+        self.write(u'Hello')
+
+    def tearDown(self):
+        shutil.rmtree(self.path)
+
+    def write(self, value, mtime=1000):
+        book = Workbook()
+        sheet = book.active
+        sheet.title = 'content'
+        sheet.append(['key', 'value'])
+        sheet.append(['greeting', value])
+        book.save(self.filename)
+
+        os.utime(self.filename, (mtime, mtime))
+
+    def test_cached(self):
+        copy = copy_cache.get_copy(self.filename)
+
+        assert unicode(copy['content']['greeting']) == u'Hello'
+        assert copy_cache.get_copy(self.filename) is copy
+        assert copy_cache.get_copy_js(self.filename) == 'window.COPY = {"content": {"greeting": "Hello"}}'
+
+        stats = copy_cache.stats()
+
+        assert stats['loads'] == 1
+        assert stats['hits'] == 2
+
+    def test_reloaded(self):
+        copy_cache.get_copy(self.filename)
+        self.write(u'Goodbye', mtime=2000)
+
+        assert unicode(copy_cache.get_copy(self.filename)['content']['greeting']) == u'Goodbye'
+        assert copy_cache.stats()['loads'] == 2
+
+    def test_snapshot(self):
+        copy_cache.write_snapshot(self.filename)
+        os.remove(self.filename)
+
+        copy = copy_cache.get_copy(self.filename)
+
+        assert isinstance(copy, copy_cache.SnapshotCopy)
+        assert unicode(copy['content']['greeting']) == u'Hello'
+        assert copy['content'][0]['key'] == u'greeting'
+        assert copy_cache.get_copy_js(self.filename) == 'window.COPY = {"content": {"greeting": "Hello"}}'
+
+    def test_stale_snapshot(self):
+        copy_cache.write_snapshot(self.filename)
+        self.write(u'Goodbye', mtime=2000)
+
+        copy = copy_cache.get_copy(self.filename)
+
+        assert not isinstance(copy, copy_cache.SnapshotCopy)
+        assert unicode(copy['content']['greeting']) == u'Goodbye'
+        assert copy_cache.get_copy_js(self.filename) == 'window.COPY = {"content": {"greeting": "Goodbye"}}'
+
+    def test_missing(self):
+        with self.assertRaises(copytext.CopyException):
+            copy_cache.get_copy(os.path.join(self.path, 'missing.xlsx'))
+
+if __name__ == '__main__':
+    unittest.main()
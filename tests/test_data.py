@@ -0,0 +1,117 @@
+#!/usr/bin/env python
+
+import json
+import os
+import shutil
+import tempfile
+import unittest
+
+from fabfile import data, schema
+
+GENRE_TAGS = ['rock', 'pop']
+
+def make_songs(titles):
+    """
+    Song rows with the given (id, title) pairs.
+    """
+    return [{
+        'id': id,
+        'artist': 'Artist',
+        'title': title,
+        'media_url': '/2015/%s' % id,
+        'explicit': 'False',
+        'featured': '',
+        'genre_tags': 'rock'
+    } for id, title in titles]
+
+class IncrementalTestCase(unittest.TestCase):
+    """
+    Test reusing unchanged rows and reporting changes between runs.
+    """
+    def setUp(self):
+        self.cwd = os.getcwd()
+        self.path = tempfile.mkdtemp()
+
+        os.chdir(self.path)
+        os.mkdir('data')
+
+    def tearDown(self):
+        os.chdir(self.cwd)
+        shutil.rmtree(self.path)
+
+    def update(self, titles, incremental=True):
+        """
+        Run the processing half of `update_songs` on song rows.
+        """
+        manifest = data._read_manifest()
+        previous = data._read_previous_songs(manifest) if incremental else None
+
+        songs = enumerate(make_songs(titles), schema.FIRST_ROW)
+        reviews = enumerate([{ 'id': 'a', 'review': 'Good' }], schema.FIRST_ROW)
+        output, hashes, report = data._process_rows(songs, reviews, GENRE_TAGS, False, previous)
+
+        with open('data/songs.json', 'w') as f:
+            json.dump(output, f)
+
+        data._write_manifest(manifest, hashes)
+
+        with open(data.SONGS_CHANGES_PATH) as f:
+            changes = json.load(f)
+
+        return output, previous, changes, report
+
+    def test_first_run(self):
+        output, previous, changes, report = self.update([('a', 'A'), ('b', 'B')], incremental=False)
+
+        assert previous is None
+        assert changes == { 'added': ['a', 'b'], 'changed': [], 'removed': [] }
+        assert [review['review'] for review in output[0]['reviews']] == ['Good']
+
+    def test_changes(self):
+        self.update([('a', 'A'), ('b', 'B'), ('c', 'C')])
+        output, previous, changes, report = self.update([('a', 'A2'), ('b', 'B')])
+
+        assert changes == { 'added': [], 'changed': ['a'], 'removed': ['c'] }
+        assert output[0]['title'] == 'A2'
+
+        # The unchanged row is the song from the last songs.json
+        assert output[1] is previous['b']['song']
+
+    def test_unchanged(self):
+        first = self.update([('a', 'A'), ('b', 'B')])[0]
+        output, previous, changes, report = self.update([('a', 'A'), ('b', 'B')])
+
+        assert changes == { 'added': [], 'changed': [], 'removed': [] }
+        assert output == first
+        assert all(song is previous[song['id']]['song'] for song in output)
+
+    def test_duplicate_ids(self):
+        output, previous, changes, report = self.update([('a', 'A'), ('b', 'B'), ('b', 'Other B')])
+
+        assert changes['added'] == ['a', 'b', 'b#2']
+        assert [issue[1] for issue in report.errors if issue[2] == 'id'] == [schema.FIRST_ROW + 2]
+
+        output, previous, changes, report = self.update([('a', 'A'), ('b', 'B'), ('b', 'Changed B')])
+
+        assert changes == { 'added': [], 'changed': ['b#2'], 'removed': [] }
+        assert output[1] is previous['b']['song']
+        assert output[2]['title'] == 'Changed B'
+
+        output, previous, changes, report = self.update([('a', 'A'), ('b', 'B')])
+
+        assert changes == { 'added': [], 'changed': [], 'removed': ['b#2'] }
+
+class RenderAlbumArtTestCase(unittest.TestCase):
+    """
+    Test building the covers manifest from rendered images.
+    """
+    def test_unrendered(self):
+        sources = { 'a': { 'mtime': 2 }, 'b': { 'mtime': 1 } }
+        manifest = { 'a': { 'source': { 'mtime': 1 }, 'default': 'a.jpg', 'derivatives': [] } }
+
+        updated = data._render_album_art([], sources, manifest, [])
+
+        assert updated == { 'a': { 'source': { 'mtime': 2 }, 'default': 'a.jpg', 'derivatives': [] } }
+
+if __name__ == '__main__':
+    unittest.main()
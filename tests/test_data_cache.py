@@ -0,0 +1,57 @@
+#!/usr/bin/env python
+
+import json
+import os
+import shutil
+import tempfile
+import unittest
+
+import data_cache
+
+class DataCacheTestCase(unittest.TestCase):
+    """
+    Test loading data files once per version.
+    """
+    def setUp(self):
+        data_cache.clear()
+
+        self.path = tempfile.mkdtemp()
+        self.filename = os.path.join(self.path, 'data.json')
+        self.write([1, 2, 3])
+
+    def tearDown(self):
+        shutil.rmtree(self.path)
+
+    def write(self, data, mtime=1000):
+        with open(self.filename, 'w') as f:
+            json.dump(data, f)
+
+        os.utime(self.filename, (mtime, mtime))
+
+    def test_cached(self):
+        entry = data_cache.get(self.filename)
+
+        assert entry.raw == '[1, 2, 3]'
+        assert data_cache.load(self.filename) == [1, 2, 3]
+        assert data_cache.load(self.filename) is entry.data
+        assert entry.derive('count', lambda e: len(e.data)) == 3
+        assert entry.derive('count', lambda e: 0) == 3
+
+    def test_invalidated(self):
+        data = data_cache.load(self.filename)
+
+        # Same mtime, different size
+        self.write([1, 2, 3, 4])
+        assert data_cache.load(self.filename) == [1, 2, 3, 4]
+
+        # Same size, different mtime
+        self.write([5, 6, 7, 8], mtime=2000)
+        assert data_cache.load(self.filename) == [5, 6, 7, 8]
+        assert data == [1, 2, 3]
+
+    def test_missing(self):
+        with self.assertRaises(OSError):
+            data_cache.get(os.path.join(self.path, 'missing.json'))
+
+if __name__ == '__main__':
+    unittest.main()
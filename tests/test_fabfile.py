@@ -0,0 +1,20 @@
+#!/usr/bin/env python
+
+import os
+import unittest
+
+from fabric.main import load_fabfile
+
+class FabfileTestCase(unittest.TestCase):
+    """
+    Test Fabric can load the fabfile and find its tasks.
+    """
+    def test_load(self):
+        docstring, tasks, default = load_fabfile(os.path.abspath('fabfile'))
+
+        assert 'data' in tasks
+        assert 'render' in tasks
+        assert 'benchmarks' in tasks
+
+if __name__ == '__main__':
+    unittest.main()
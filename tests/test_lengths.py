@@ -0,0 +1,99 @@
+#!/usr/bin/env python
+
+import csv
+import json
+import os
+import shutil
+import tempfile
+import unittest
+
+from collections import OrderedDict
+
+from fabfile import lengths
+
+SONGS = [
+    { 'id': 'a', 'genre_tags': ['rock', 'pop'], 'explicit': 'True' },
+    { 'id': 'b', 'genre_tags': ['rock'], 'explicit': 'False' },
+    { 'id': 'c', 'genre_tags': ['pop', 'not-a-tag'], 'explicit': 'False' }
+]
+
+# Seconds
+LENGTHS = [600, 1800, 3900]
+
+TAGS = OrderedDict([
+    ('rock', { 'genre': 'True' }),
+    ('pop', { 'genre': 'False' })
+])
+
+class AggregateLengthsTestCase(unittest.TestCase):
+    """
+    Test song counts and durations per tag.
+    """
+    def setUp(self):
+        self.path = tempfile.mkdtemp()
+
+    def tearDown(self):
+        shutil.rmtree(self.path)
+
+    def test_membership_matrix(self):
+        matrix = lengths.membership_matrix(SONGS, TAGS.keys())
+
+        assert matrix.tolist() == [[True, True], [True, False], [False, True]]
+
+    def test_aggregate(self):
+        report = lengths.aggregate_lengths(SONGS, LENGTHS, TAGS)
+        rock, pop = report['tags']
+
+        assert rock == {
+            'tag': 'rock',
+            'type': 'genre',
+            'count': 2,
+            'minutes': 40.0,
+            'clean_count': 1,
+            'clean_minutes': 30.0,
+            'explicit_count': 1,
+            'explicit_minutes': 10.0
+        }
+        assert pop == {
+            'tag': 'pop',
+            'type': 'playlist',
+            'count': 2,
+            'minutes': 75.0,
+            'clean_count': 1,
+            'clean_minutes': 65.0,
+            'explicit_count': 1,
+            'explicit_minutes': 10.0
+        }
+
+        # The multi-tagged song counts once in the total
+        assert report['total'] == {
+            'count': 3,
+            'minutes': 105.0,
+            'clean_count': 2,
+            'clean_minutes': 95.0,
+            'explicit_count': 1,
+            'explicit_minutes': 10.0
+        }
+
+    def test_write_reports(self):
+        report = lengths.aggregate_lengths(SONGS, LENGTHS, TAGS)
+        csv_path = os.path.join(self.path, 'song-lengths.csv')
+        json_path = os.path.join(self.path, 'song-lengths.json')
+
+        lengths.write_reports(report, csv_path, json_path)
+
+        with open(json_path) as f:
+            assert json.load(f) == json.loads(json.dumps(report))
+
+        with open(csv_path) as f:
+            rows = list(csv.reader(f))
+
+        assert rows[0] == lengths.CSV_COLUMNS
+        assert rows[1][:3] + rows[1][4:7] == ['rock', '2', '40.0', '0', '40', 'genre']
+        assert abs(float(rows[1][3]) - 40.0 / 60) < 1e-9
+        assert rows[2][:7] == ['pop', '2', '75.0', '1.25', '1', '15', 'playlist']
+        assert rows[3][:6] == ['total', '3', '105.0', '1.75', '1', '45']
+        assert rows[4] == ['clean total', '2', '95.0', '', '', '']
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,232 @@
+#!/usr/bin/env python
+
+import BaseHTTPServer
+import os
+import shutil
+import struct
+import tempfile
+import threading
+import unittest
+
+from mutagen.mp3 import MP3
+
+from fabfile import data, mp3
+from fabfile.mp3cache import Mp3Cache
+
+# MPEG1 Layer III, 128kbps, 44.1kHz, stereo
+FRAME_HEADER = '\xff\xfb\x90\x00'
+FRAME_LENGTH = 417
+
+def make_frame(payload=''):
+    return FRAME_HEADER + payload + '\x00' * (FRAME_LENGTH - 4 - len(payload))
+
+def make_id3(size):
+    syncsafe = ''.join(chr((size >> shift) & 0x7F) for shift in (21, 14, 7, 0))
+
+    return 'ID3\x03\x00\x00' + syncsafe + '\x00' * size
+
+def make_cbr(frames, tag_size=0):
+    return make_id3(tag_size) + make_frame() * frames
+
+def make_xing(frames, actual_frames):
+    # Side info for MPEG1 stereo is 32 bytes
+    xing = '\x00' * 32 + 'Xing' + struct.pack('>II', 1, frames)
+
+    return make_frame(xing) + make_frame() * actual_frames
+
+class RangeHandler(BaseHTTPServer.BaseHTTPRequestHandler):
+    """
+    Serve fixture files, honoring single byte ranges.
+    """
+    def do_GET(self):
+        server = self.server
+        data = server.files.get(self.path)
+
+        if data is None:
+            self.send_error(404)
+            return
+
+        range_header = self.headers.getheader('Range')
+
+        if range_header and server.honor_range:
+            start, end = [int(i) for i in range_header.split('=')[1].split('-')]
+            end = min(end, len(data) - 1)
+            body = data[start:end + 1]
+
+            self.send_response(206)
+            self.send_header('Content-Range', 'bytes %i-%i/%i' % (start, end, len(data)))
+        else:
+            body = data
+            self.send_response(200)
+
+        self.send_header('Content-Length', str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+        server.bytes_sent += len(body)
+
+    def log_message(self, *args):
+        pass
+
+class ProbeTestCase(unittest.TestCase):
+    """
+    Test probing MP3 durations against a local server.
+    """
+    def setUp(self):
+        self.server = BaseHTTPServer.HTTPServer(('127.0.0.1', 0), RangeHandler)
+        self.server.files = {
+            '/cbr.mp3': make_cbr(300),
+            '/cbr-big-tag.mp3': make_cbr(300, tag_size=40000),
+            '/xing.mp3': make_xing(1000, 50),
+            '/garbage.mp3': 'not an mp3' * 1000
+        }
+        self.server.honor_range = True
+        self.server.bytes_sent = 0
+
+        thread = threading.Thread(target=self.server.serve_forever)
+        thread.daemon = True
+        thread.start()
+
+    def tearDown(self):
+        self.server.shutdown()
+        self.server.server_close()
+
+    def url(self, path):
+        return 'http://127.0.0.1:%i%s' % (self.server.server_port, path)
+
+    def mutagen_length(self, path):
+        with tempfile.NamedTemporaryFile(suffix='.mp3') as f:
+            f.write(self.server.files[path])
+            f.flush()
+
+            return MP3(f.name).info.length
+
+    def test_cbr(self):
+        length = mp3.probe_mp3_length(self.url('/cbr.mp3'))
+
+        assert abs(length - self.mutagen_length('/cbr.mp3')) < 0.05
+        assert self.server.bytes_sent <= mp3.PROBE_BYTES
+
+    def test_cbr_big_tag(self):
+        length = mp3.probe_mp3_length(self.url('/cbr-big-tag.mp3'))
+
+        assert abs(length - self.mutagen_length('/cbr-big-tag.mp3')) < 0.05
+        assert self.server.bytes_sent <= mp3.PROBE_BYTES * 2
+
+    def test_xing(self):
+        length = mp3.probe_mp3_length(self.url('/xing.mp3'))
+
+        assert abs(length - 1000 * 1152 / 44100.0) < 0.001
+        assert abs(length - self.mutagen_length('/xing.mp3')) < 0.001
+
+    def test_inconclusive(self):
+        assert mp3.probe_mp3_length(self.url('/garbage.mp3')) is None
+
+    def test_range_not_honored(self):
+        self.server.honor_range = False
+
+        assert mp3.probe_mp3_length(self.url('/cbr.mp3')) is None
+
+    def test_dead_link(self):
+        path = tempfile.mkdtemp()
+        cache = Mp3Cache(path)
+
+        try:
+            assert data.get_mp3_length(self.url('/missing.mp3'), cache=cache) == 0
+            assert cache.get_duration(self.url('/missing.mp3')) is None
+            assert data.get_mp3_length('http://127.0.0.1:1/refused.mp3', probe=False, cache=cache) == 0
+        finally:
+            cache.close()
+            shutil.rmtree(path)
+
+class Mp3CacheTestCase(unittest.TestCase):
+    """
+    Test the MP3 cache index and eviction.
+    """
+    def setUp(self):
+        self.path = tempfile.mkdtemp()
+        self.cache = Mp3Cache(self.path, max_bytes=1000)
+
+    def tearDown(self):
+        self.cache.close()
+        shutil.rmtree(self.path)
+
+    def test_store(self):
+        path = self.cache.store('http://example.com/a.mp3', ['abc', 'def'])
+
+        assert open(path).read() == 'abcdef'
+        assert self.cache.get_path('http://example.com/a.mp3') == path
+        assert self.cache.get_duration('http://example.com/a.mp3') is None
+
+        self.cache.set_duration('http://example.com/a.mp3', 1.5)
+
+        assert self.cache.get_duration('http://example.com/a.mp3') == 1.5
+
+    def test_failed_store(self):
+        def blocks():
+            yield 'abc'
+            raise IOError()
+
+        self.assertRaises(IOError, self.cache.store, 'http://example.com/a.mp3', blocks())
+
+        assert os.listdir(self.path) == ['index.sqlite']
+        assert self.cache.get_path('http://example.com/a.mp3') is None
+
+    def test_evict(self):
+        self.cache.store('http://example.com/a.mp3', ['a' * 600])
+        self.cache.store('http://example.com/b.mp3', ['b' * 600])
+        self.cache.set_duration('http://example.com/a.mp3', 1.5)
+        self.cache.evict()
+
+        assert self.cache.size() == 600
+        assert self.cache.get_path('http://example.com/a.mp3') is not None
+        assert self.cache.get_path('http://example.com/b.mp3') is None
+        assert self.cache.get_duration('http://example.com/a.mp3') == 1.5
+
+    def test_evict_pinned(self):
+        a = self.cache.store('http://example.com/a.mp3', ['a' * 600], pin=True)
+        self.cache.store('http://example.com/b.mp3', ['b' * 600], pin=True)
+        self.cache.evict()
+
+        assert self.cache.size() == 1200
+
+        self.cache.unpin(a)
+        self.cache.evict()
+
+        assert self.cache.size() == 600
+        assert self.cache.get_path('http://example.com/a.mp3') is None
+
+    def test_remove_legacy_files(self):
+        audio = self.cache.store('http://example.com/a.mp3', ['abc'])
+        self.cache.close()
+        legacy = os.path.join(self.path, 'podcastdownload.npr.org-anon.npr-mp3-a.mp3')
+
+        with open(legacy, 'w') as f:
+            f.write('abc')
+
+        self.cache = Mp3Cache(self.path, max_bytes=1000)
+
+        assert not os.path.exists(legacy)
+        assert os.path.exists(audio)
+
+    def test_get_mp3_length_evicts(self):
+        server = BaseHTTPServer.HTTPServer(('127.0.0.1', 0), RangeHandler)
+        server.files = { '/garbage.mp3': 'not an mp3' * 1000 }
+        server.honor_range = True
+        server.bytes_sent = 0
+
+        thread = threading.Thread(target=server.serve_forever)
+        thread.daemon = True
+        thread.start()
+
+        try:
+            url = 'http://127.0.0.1:%i/garbage.mp3' % server.server_port
+
+            assert data.get_mp3_length(url, probe=False, cache=self.cache) == 0
+            assert self.cache.size() == 0
+            assert not self.cache.pinned
+        finally:
+            server.shutdown()
+            server.server_close()
+
+if __name__ == '__main__':
+    unittest.main()
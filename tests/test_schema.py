@@ -0,0 +1,72 @@
+#!/usr/bin/env python
+
+import json
+import os
+import shutil
+import tempfile
+import unittest
+
+from fabfile import schema
+
+class SchemaTestCase(unittest.TestCase):
+    """
+    Test compiled validation of song and review rows.
+    """
+    def validate(self, rows, rules, context=None):
+        report = schema.ValidationReport()
+        validate = schema.compile_schema(rules, 'songs', context)
+
+        validate(list(enumerate(rows, schema.FIRST_ROW)), report)
+
+        return report
+
+    def test_valid(self):
+        song = { 'id': 'a', 'artist': 'A', 'title': 'T', 'media_url': '/2015/a', 'explicit': 'False', 'featured': '', 'genre_tags': 'rock, pop' }
+        report = self.validate([song], schema.SONG_SCHEMA, { 'genre_tags': set(['rock', 'pop']) })
+
+        assert report.errors == []
+        assert report.warnings == []
+
+    def test_rules(self):
+        rows = [
+            { 'id': 'a', 'media_url': '/a', 'explicit': 'yes', 'genre_tags': 'rock, jazz,' },
+            { 'id': 'a', 'media_url': 'a b' },
+            { 'id': None, 'media_url': '/a' }
+        ]
+        report = self.validate(rows, [
+            { 'field': 'id', 'required': True, 'unique': True },
+            { 'field': 'media_url', 'pattern': r'^/\S+$', 'unique': True, 'level': 'warning' },
+            { 'field': 'explicit', 'choices': ['True', 'False'] },
+            { 'field': 'genre_tags', 'separator': ',', 'choices': 'tags', 'level': 'warning' }
+        ], { 'tags': ['rock'] })
+
+        assert [(row, field, message) for sheet, row, field, message, value in report.errors] == [
+            (2, 'explicit', 'yes is not a valid explicit'),
+            (3, 'id', 'Duplicate id, first seen in row 2'),
+            (4, 'id', 'Missing id')
+        ]
+        assert [(row, field, value) for sheet, row, field, message, value in report.warnings] == [
+            (2, 'genre_tags', 'jazz'),
+            (3, 'media_url', 'a b'),
+            (4, 'media_url', '/a')
+        ]
+
+    def test_report(self):
+        report = schema.ValidationReport()
+        report.add('error', 'songs', 5, 'id', 'Missing id')
+
+        path = tempfile.mkdtemp()
+
+        try:
+            report.write(os.path.join(path, 'report.json'))
+
+            with open(os.path.join(path, 'report.json')) as f:
+                written = json.load(f)
+        finally:
+            shutil.rmtree(path)
+
+        assert written['error_count'] == 1
+        assert written['errors'][0] == { 'sheet': 'songs', 'row': 5, 'field': 'id', 'message': 'Missing id', 'value': None }
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,67 @@
+#!/usr/bin/env python
+
+import json
+import os
+import shutil
+import tempfile
+import unittest
+
+from fabfile import shards
+
+SONGS = [
+    { 'id': 'a', 'genre_tags': ['rock', 'mixtape'], 'explicit': 'True' },
+    { 'id': 'b', 'genre_tags': ['pop'] },
+    { 'id': 'c', 'genre_tags': ['rock', 'not-a-tag'] }
+]
+
+TAGS = {
+    'rock': { 'genre': 'True', 'hours': '1', 'minutes': '30' },
+    'pop': { 'genre': 'True', 'hours': '', 'minutes': '45' },
+    'mixtape': { 'genre': 'False', 'hours': 'n/a', 'minutes': '' }
+}
+
+class WriteShardsTestCase(unittest.TestCase):
+    """
+    Test splitting songs into a shard per tag.
+    """
+    def setUp(self):
+        self.path = tempfile.mkdtemp()
+
+    def tearDown(self):
+        shutil.rmtree(self.path)
+
+    def load(self, filename):
+        with open(os.path.join(self.path, filename)) as f:
+            return json.load(f)
+
+    def test_shards(self):
+        index = shards.write_shards(SONGS, TAGS, self.path, 'data/songs')
+
+        assert [song['id'] for song in self.load(shards.shard_filename('rock'))] == ['a', 'c']
+        assert [song['id'] for song in self.load('all.json')] == ['a', 'b', 'c']
+        assert self.load('index.json') == json.loads(json.dumps(index))
+
+        assert index['all']['count'] == 3
+        assert index['all']['clean_count'] == 2
+        assert index['tags']['rock'] == { 'url': 'data/songs/%s' % shards.shard_filename('rock'), 'count': 2, 'clean_count': 1, 'duration': 90 }
+        assert index['tags']['pop']['duration'] == 45
+        assert index['tags']['mixtape']['duration'] is None
+        assert 'not-a-tag' not in index['tags']
+
+    def test_removed_tag(self):
+        shards.write_shards(SONGS, TAGS, self.path)
+        shards.write_shards(SONGS, dict((k, v) for k, v in TAGS.items() if k != 'pop'), self.path)
+
+        assert not os.path.exists(os.path.join(self.path, shards.shard_filename('pop')))
+        assert not os.path.exists(os.path.join(self.path, shards.shard_filename('pop') + '.gz'))
+        assert os.path.exists(os.path.join(self.path, shards.shard_filename('rock') + '.gz'))
+
+    def test_similar_tags(self):
+        tags = ['R&B', 'R-B', 'Hip Hop', 'Hip-Hop']
+        filenames = [shards.shard_filename(tag) for tag in tags]
+
+        assert len(set(filenames)) == len(tags)
+        assert filenames[0].startswith('tag-R-B-')
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,235 @@
+#!/usr/bin/env python
+
+import BaseHTTPServer
+import json
+import os
+import shutil
+import tempfile
+import threading
+import unittest
+import urlparse
+
+from twitter import OAuth
+
+from fabfile import data
+from fabfile.social import ApiCache, SocialClient, link_tweet_entities
+
+TWEET = {
+    'id': 123,
+    'created_at': 'Wed Jun 03 16:00:00 +0000 2015',
+    'text': 'Listen to #bestsongs2015 http://t.co/abc',
+    'entities': {
+        'hashtags': [{ 'text': 'bestsongs2015', 'indices': [10, 24] }],
+        'urls': [{ 'url': 'http://t.co/abc', 'display_url': 'n.pr/abc', 'indices': [25, 40] }]
+    },
+    'favorite_count': 5,
+    'retweet_count': 2,
+    'user': {
+        'id': 1,
+        'name': 'NPR Music',
+        'screen_name': 'nprmusic',
+        'profile_image_url': 'http://example.com/nprmusic.jpg',
+        'url': 'http://npr.org/music'
+    }
+}
+
+GRAPH = {
+    '/graph/10': {
+        'id': '10',
+        'created_time': '2015-06-03T16:00:00+0000',
+        'message': 'Our favorite songs',
+        'link': 'http://n.pr/abc',
+        'name': 'Best Songs',
+        'description': 'So far',
+        'picture': 'http://example.com/post.jpg',
+        'from': { 'id': '20' }
+    },
+    '/graph/10/likes': { 'summary': { 'total_count': 7 } },
+    '/graph/10/comments': { 'summary': { 'total_count': 3 } },
+    '/graph/11': {
+        'id': '11',
+        'created_time': '2015-06-04T16:00:00+0000',
+        'message': 'More songs',
+        'link': 'http://n.pr/def',
+        'name': 'More Best Songs',
+        'description': 'Still',
+        'picture': 'http://example.com/post2.jpg',
+        'from': { 'id': '20' }
+    },
+    '/graph/11/likes': { 'summary': { 'total_count': 1 } },
+    '/graph/11/comments': { 'summary': { 'total_count': 0 } },
+    '/graph/20': { 'name': 'NPR Music', 'link': 'http://facebook.com/nprmusic' },
+    '/graph/20/picture': { 'data': { 'url': 'http://example.com/user.jpg' } }
+}
+
+class ApiHandler(BaseHTTPServer.BaseHTTPRequestHandler):
+    """
+    Stand-in for the Twitter and Facebook Graph APIs.
+    """
+    def do_GET(self):
+        url = urlparse.urlparse(self.path)
+        query = urlparse.parse_qs(url.query)
+        self.server.requests.append(url.path)
+
+        if url.path == '/1.1/statuses/show.json' and 'oauth_signature' in query:
+            body = TWEET
+        elif url.path in GRAPH and query.get('access_token') == ['token']:
+            body = GRAPH[url.path]
+        else:
+            self.send_error(404)
+            return
+
+        self.send_response(200)
+        self.send_header('Content-Type', 'application/json')
+        self.end_headers()
+        self.wfile.write(json.dumps(body))
+
+    def log_message(self, *args):
+        pass
+
+class FeaturedSocialTestCase(unittest.TestCase):
+    """
+    Test fetching featured content against local stand-in APIs.
+    """
+    def setUp(self):
+        self.server = BaseHTTPServer.HTTPServer(('127.0.0.1', 0), ApiHandler)
+        self.server.requests = []
+
+        thread = threading.Thread(target=self.server.serve_forever)
+        thread.daemon = True
+        thread.start()
+
+        self.cache_path = tempfile.mkdtemp()
+
+    def tearDown(self):
+        self.server.shutdown()
+        self.server.server_close()
+        shutil.rmtree(self.cache_path)
+
+    def client(self):
+        base_url = 'http://127.0.0.1:%i' % self.server.server_port
+
+        return SocialClient(
+            OAuth('token', 'secret', 'key', 'secret'),
+            'token',
+            cache=ApiCache(self.cache_path),
+            twitter_url='%s/1.1/' % base_url,
+            graph_url='%s/graph/' % base_url
+        )
+
+    def test_featured(self):
+        output = data.get_featured_social(self.client(), ['123'], ['10'])
+
+        tweet = output['tweets'][0]
+        post = output['facebook_posts'][0]
+
+        assert tweet['url'] == 'http://twitter.com/nprmusic/status/123'
+        assert tweet['creation_date'] == 'Jun 3'
+        assert 'https://twitter.com/hashtag/bestsongs2015' in tweet['html']
+        assert post['from']['picture'] == 'http://example.com/user.jpg'
+        assert post['likes'] == 7
+        assert post['comments'] == 3
+        assert len(self.server.requests) == 6
+
+    def test_cached(self):
+        data.get_featured_social(self.client(), ['123'], ['10'])
+        data.get_featured_social(self.client(), ['123'], ['10'])
+
+        assert len(self.server.requests) == 6
+
+    def test_expired(self):
+        data.get_featured_social(self.client(), ['123'], ['10'])
+
+        client = self.client()
+        client.cache.ttls = dict(client.cache.ttls, facebook_likes=-1)
+        data.get_featured_social(client, ['123'], ['10'])
+
+        assert self.server.requests[6:] == ['/graph/10/likes']
+
+    def test_shared_author(self):
+        output = data.get_featured_social(self.client(), [], ['10', '11'])
+
+        assert [post['from']['picture'] for post in output['facebook_posts']] == ['http://example.com/user.jpg'] * 2
+        assert self.server.requests.count('/graph/20') == 1
+        assert self.server.requests.count('/graph/20/picture') == 1
+
+class ApiCacheTestCase(unittest.TestCase):
+    """
+    Test storing raw API responses.
+    """
+    def setUp(self):
+        self.cache_path = tempfile.mkdtemp()
+
+    def tearDown(self):
+        shutil.rmtree(self.cache_path)
+
+    def test_concurrent_set(self):
+        cache = ApiCache(self.cache_path)
+        errors = []
+
+        def store(i):
+            try:
+                for j in range(50):
+                    cache.set('facebook_user', '20', { 'writer': i })
+            except Exception as e:
+                errors.append(e)
+
+        threads = [threading.Thread(target=store, args=(i,)) for i in range(3)]
+
+        for thread in threads:
+            thread.start()
+
+        for thread in threads:
+            thread.join()
+
+        assert errors == []
+        assert cache.get('facebook_user', '20')['writer'] in (0, 1, 2)
+        assert len(os.listdir(self.cache_path)) == 1
+
+class LinkTweetEntitiesTestCase(unittest.TestCase):
+    """
+    Test splicing links into tweet text by entity offsets.
+    """
+    def link(self, text, **entities):
+        return link_tweet_entities({ 'text': text, 'entities': entities }, 'http://twitter.com/nprmusic/status/123')
+
+    def test_entities(self):
+        html = link_tweet_entities(TWEET, 'http://twitter.com/nprmusic/status/123')
+
+        assert html.startswith('Listen to <a href="https://twitter.com/hashtag/bestsongs2015"')
+        assert '>#bestsongs2015</a> <a href="http://t.co/abc"' in html
+        assert html.endswith('>n.pr/abc</a>')
+
+    def test_no_entities(self):
+        assert self.link(u'Nothing to link') == u'Nothing to link'
+
+    def test_substring(self):
+        # A plain string replace would also link the start of #rocknroll
+        html = self.link(u'#rock #rocknroll', hashtags=[
+            { 'text': 'rocknroll', 'indices': [6, 16] },
+            { 'text': 'rock', 'indices': [0, 5] }
+        ])
+
+        assert html.count('<a ') == 2
+        assert '>#rock</a> <a href="https://twitter.com/hashtag/rocknroll"' in html
+
+    def test_repeated(self):
+        html = self.link(u'#pop and #pop', hashtags=[
+            { 'text': 'pop', 'indices': [0, 4] },
+            { 'text': 'pop', 'indices': [9, 13] }
+        ])
+
+        assert html.count('>#pop</a>') == 2
+        assert ' and ' in html
+
+    def test_astral(self):
+        # Offsets count code points, even where narrow builds use surrogates
+        html = self.link(u'\U0001F3B8\U0001F3B8 #rock!', hashtags=[
+            { 'text': 'rock', 'indices': [3, 8] }
+        ])
+
+        assert html.startswith(u'\U0001F3B8\U0001F3B8 <a ')
+        assert html.endswith(u'>#rock</a>!')
+
+if __name__ == '__main__':
+    unittest.main()
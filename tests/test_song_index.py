@@ -0,0 +1,76 @@
+#!/usr/bin/env python
+
+import os
+import shutil
+import tempfile
+import unittest
+
+import song_index
+
+SONGS = [
+    {
+        'id': 'a',
+        'artist': u'Bj\xf6rk',
+        'title': u'&#8220;Stonemilker&#8221;',
+        'explicit': 'False',
+        'featured': True,
+        'genre_tags': ['rock', 'pop'],
+        'reviews': [{ 'id': 'a', 'reviewer': 'Ann', 'review': 'Great' }, { 'id': 'a', 'reviewer': 'Bob', 'review': 'Fine' }]
+    },
+    {
+        'id': 'b',
+        'artist': 'Adele',
+        'title': 'Hello',
+        'explicit': 'False',
+        'featured': False,
+        'genre_tags': [],
+        'reviews': [],
+        'spotify': None
+    }
+]
+
+class SongIndexTestCase(unittest.TestCase):
+    """
+    Test writing and reading the columnar song index.
+    """
+    def setUp(self):
+        self.tmp_path = tempfile.mkdtemp()
+        self.path = os.path.join(self.tmp_path, 'songs.idx')
+        song_index.write_index(SONGS, self.path)
+        self.index = song_index.SongIndex(self.path)
+
+    def tearDown(self):
+        self.index.close()
+        shutil.rmtree(self.tmp_path)
+
+    def test_round_trip(self):
+        assert len(self.index) == 2
+        assert [song.to_dict() for song in self.index] == [dict(SONGS[0], spotify=None), SONGS[1]]
+
+    def test_record(self):
+        song = self.index[0]
+
+        assert song['artist'] == u'Bj\xf6rk'
+        assert song['featured'] is True
+        assert song['genre_tags'] == ['rock', 'pop']
+        assert song['reviews'][1]['reviewer'] == 'Bob'
+        assert song.get('missing') is None
+        assert 'spotify' in song
+        self.assertRaises(KeyError, lambda: song['missing'])
+        self.assertRaises(IndexError, lambda: self.index[2])
+
+    def test_interned(self):
+        # Repeated values are stored once
+        with open(self.path, 'rb') as f:
+            assert f.read().count('False') == 1
+
+        assert self.index.column('explicit') == ['False', 'False']
+
+    def test_not_an_index(self):
+        with open(self.path, 'wb') as f:
+            f.write('[]')
+
+        self.assertRaises(ValueError, song_index.SongIndex, self.path)
+
+if __name__ == '__main__':
+    unittest.main()
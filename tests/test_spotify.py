@@ -0,0 +1,97 @@
+#!/usr/bin/env python
+
+import BaseHTTPServer
+import json
+import os
+import shutil
+import tempfile
+import threading
+import unittest
+import urlparse
+
+import spotipy
+
+from fabfile import spotify
+
+class TracksHandler(BaseHTTPServer.BaseHTTPRequestHandler):
+    """
+    Stand-in for the Spotify tracks endpoint. Ids starting with "missing"
+    resolve to null and ids starting with "bad" fail the whole request.
+    """
+    def do_GET(self):
+        url = urlparse.urlparse(self.path)
+        ids = urlparse.parse_qs(url.query)['ids'][0].split(',')
+        self.server.requests.append(ids)
+
+        if any(id.startswith('bad') for id in ids):
+            self.send_response(400)
+            body = { 'error': { 'status': 400, 'message': 'invalid id' } }
+        else:
+            self.send_response(200)
+            body = { 'tracks': [None if id.startswith('missing') else { 'uri': 'spotify:track:%s' % id, 'name': id, 'track_number': 1 } for id in ids] }
+
+        self.send_header('Content-Type', 'application/json')
+        self.end_headers()
+        self.wfile.write(json.dumps(body))
+
+    def log_message(self, *args):
+        pass
+
+class ResolveTracksTestCase(unittest.TestCase):
+    """
+    Test resolving tracks against a local stand-in API.
+    """
+    def setUp(self):
+        self.server = BaseHTTPServer.HTTPServer(('127.0.0.1', 0), TracksHandler)
+        self.server.requests = []
+
+        thread = threading.Thread(target=self.server.serve_forever)
+        thread.daemon = True
+        thread.start()
+
+        self.sp = spotipy.Spotify()
+        self.sp.prefix = 'http://127.0.0.1:%i/v1/' % self.server.server_port
+
+        self.tmp_path = tempfile.mkdtemp()
+        self.cache_path = os.path.join(self.tmp_path, 'cache.json')
+
+    def tearDown(self):
+        self.server.shutdown()
+        self.server.server_close()
+        shutil.rmtree(self.tmp_path)
+
+    def test_track_id(self):
+        assert spotify.track_id('spotify:track:abc') == 'abc'
+        assert spotify.track_id('https://open.spotify.com/track/abc') == 'abc'
+        assert spotify.track_id('http://open.spotify.com/track/abc?si=1') == 'abc'
+        assert spotify.track_id('abc') == 'abc'
+
+    def test_batches(self):
+        ids = ['track%i' % i for i in range(120)]
+        tracks, failed = spotify.resolve_tracks(self.sp, ids, self.cache_path)
+
+        assert [len(batch) for batch in self.server.requests] == [50, 50, 20]
+        assert len(tracks) == 120
+        assert tracks['track7']['uri'] == 'spotify:track:track7'
+        assert failed == []
+
+    def test_cached(self):
+        spotify.resolve_tracks(self.sp, ['track1', 'track2'], self.cache_path)
+        tracks, failed = spotify.resolve_tracks(self.sp, ['track1', 'track2', 'track3'], self.cache_path)
+
+        assert self.server.requests == [['track1', 'track2'], ['track3']]
+        assert len(tracks) == 3
+
+    def test_failed(self):
+        tracks, failed = spotify.resolve_tracks(self.sp, ['track1', 'missing1', 'bad1', 'track2'], self.cache_path)
+
+        assert sorted(tracks.keys()) == ['track1', 'track2']
+        assert failed == ['missing1', 'bad1']
+
+        # Failures are retried, successes are not
+        spotify.resolve_tracks(self.sp, ['track1', 'missing1'], self.cache_path)
+
+        assert self.server.requests[-1] == ['missing1']
+
+if __name__ == '__main__':
+    unittest.main()
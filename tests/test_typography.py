@@ -0,0 +1,46 @@
+#!/usr/bin/env python
+
+import unittest
+
+from flask import Markup
+
+import render_utils
+import typography
+
+class TypographyTestCase(unittest.TestCase):
+    """
+    Test the memoized typography shared by the pipeline and filters.
+    """
+    def setUp(self):
+        typography.clear()
+
+    def test_smartypants(self):
+        assert typography.smartypants(u'It\'s "caf\xe9"') == u'It&#8217;s &#8220;caf\xe9&#8221;'
+        assert typography.smartypants(u'It\'s "caf\xe9"') == u'It&#8217;s &#8220;caf\xe9&#8221;'
+
+        stats = typography.stats()['smartypants']
+
+        assert stats['hits'] == 1
+        assert stats['misses'] == 1
+
+    def test_filters_share_cache(self):
+        typography.smartypants(u'Song -- title')
+
+        assert render_utils.smarty_filter(u'Song -- title') == Markup(u'Song &#8212; title')
+        assert render_utils.urlencode_filter(u'caf\xe9 & co') == Markup('caf%C3%A9+%26+co')
+        assert typography.stats()['smartypants']['hits'] == 1
+
+    def test_bounded(self):
+        cache = typography.LRUCache(2)
+
+        cache.get('a', str.upper)
+        cache.get('b', str.upper)
+        cache.get('a', str.upper)
+        cache.get('c', str.upper)
+
+        assert cache.entries.keys() == ['a', 'c']
+        assert cache.hits == 1
+        assert cache.misses == 3
+
+if __name__ == '__main__':
+    unittest.main()
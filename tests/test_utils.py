@@ -0,0 +1,62 @@
+#!/usr/bin/env python
+
+import gzip
+import json
+import os
+import shutil
+import tempfile
+import unittest
+
+from fabfile import utils
+
+class WriteJsonTestCase(unittest.TestCase):
+    """
+    Test writing compact JSON with a precompressed sibling.
+    """
+    def setUp(self):
+        self.tmp_path = tempfile.mkdtemp()
+        self.path = os.path.join(self.tmp_path, 'songs.json')
+
+    def tearDown(self):
+        shutil.rmtree(self.tmp_path)
+
+    def test_write(self):
+        songs = [{ 'id': 'a', 'title': u'Caf\xe9' }, { 'id': 'b', 'reviews': [] }]
+        utils.write_json(self.path, iter(songs))
+
+        with open(self.path) as f:
+            contents = f.read()
+
+        with gzip.open(utils.gzip_path(self.path)) as f:
+            assert f.read() == contents
+
+        assert json.loads(contents) == songs
+        assert ', ' not in contents and ': ' not in contents
+        assert utils.has_fresh_gzip(self.path)
+        assert sorted(os.listdir(self.tmp_path)) == ['songs.json', 'songs.json.gz']
+
+    def test_empty(self):
+        utils.write_json(self.path, [], compress=False)
+
+        with open(self.path) as f:
+            assert json.load(f) == []
+
+        assert not utils.has_fresh_gzip(self.path)
+
+    def test_failed(self):
+        utils.write_json(self.path, [1])
+
+        def songs():
+            yield 2
+            raise ValueError
+
+        self.assertRaises(ValueError, utils.write_json, self.path, songs())
+
+        # The previous files are left untouched
+        with open(self.path) as f:
+            assert json.load(f) == [1]
+
+        assert sorted(os.listdir(self.tmp_path)) == ['songs.json', 'songs.json.gz']
+
+if __name__ == '__main__':
+    unittest.main()
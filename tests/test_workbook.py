@@ -0,0 +1,54 @@
+#!/usr/bin/env python
+
+import os
+import shutil
+import tempfile
+import unittest
+
+from openpyxl import Workbook
+
+from fabfile import workbook
+
+class WorkbookTestCase(unittest.TestCase):
+    """
+    Test streaming rows out of a spreadsheet.
+    """
+    def setUp(self):
+        self.path = tempfile.mkdtemp()
+        self.filename = os.path.join(self.path, 'songs.xlsx')
+
+        book = Workbook()
+        sheet = book.active
+        sheet.title = 'songs'
+        sheet.append(['id', 'title', 'genre_tags', None, 'ignored'])
+        sheet.append(['a', u'Caf\xe9'])
+        sheet.append([None, None])
+        sheet.append([2015, 'Two', 'rock', None, 'x'])
+        sheet.append(['c', None, None, None, 'x'])
+        book.save(self.filename)
+
+    def tearDown(self):
+        shutil.rmtree(self.path)
+
+    def test_iter_rows(self):
+        rows = list(workbook.iter_rows(self.filename, 'songs'))
+
+        assert [row_number for row_number, row in rows] == [2, 4, 5]
+        assert rows[0][1].items() == [('id', u'a'), ('title', u'Caf\xe9'), ('genre_tags', u'')]
+        assert rows[1][1] == { 'id': u'2015', 'title': u'Two', 'genre_tags': u'rock' }
+
+    def test_blank_cells(self):
+        rows = list(workbook.iter_rows(self.filename, 'songs'))
+
+        assert rows[2][1] == { 'id': u'c', 'title': u'', 'genre_tags': u'' }
+        assert all(isinstance(value, unicode) for row_number, row in rows for value in row.values())
+
+    def test_missing(self):
+        with self.assertRaises(workbook.WorkbookException):
+            list(workbook.iter_rows(self.filename, 'reviews'))
+
+        with self.assertRaises(workbook.WorkbookException):
+            list(workbook.iter_rows(os.path.join(self.path, 'missing.xlsx'), 'songs'))
+
+if __name__ == '__main__':
+    unittest.main()
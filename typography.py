@@ -0,0 +1,104 @@
+#!/usr/bin/env python
+
+"""
+Memoized typography shared by the data pipeline and template filters.
+
+Titles, artists and reviews repeat across every page that lists songs,
+so each transform keeps a bounded LRU cache of its results.
+"""
+
+import threading
+import urllib
+
+from collections import OrderedDict
+from smartypants import smartypants as _smartypants
+
+CACHE_SIZE = 8192
+
+class LRUCache(object):
+    """
+    A bounded mapping that drops its least recently used entries.
+    Safe to share between threads.
+    """
+    def __init__(self, size=CACHE_SIZE):
+        self.size = size
+        self.entries = OrderedDict()
+        self.lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    def get(self, key, compute):
+        """
+        Return the cached value for `key`, calling `compute(key)` on a miss.
+        """
+        with self.lock:
+            try:
+                value = self.entries.pop(key)
+            except KeyError:
+                self.misses += 1
+            else:
+                self.hits += 1
+                self.entries[key] = value
+
+                return value
+
+        value = compute(key)
+
+        with self.lock:
+            self.entries[key] = value
+
+            while len(self.entries) > self.size:
+                self.entries.popitem(last=False)
+
+        return value
+
+    def clear(self):
+        with self.lock:
+            self.entries.clear()
+            self.hits = 0
+            self.misses = 0
+
+_smartypants_cache = LRUCache()
+_urlencode_cache = LRUCache()
+
+def _to_unicode(s):
+    # Evaluates COPY elements
+    if type(s) is not unicode:
+        s = unicode(s)
+
+    return s
+
+def smartypants(s):
+    """
+    Smartypants a string, returning unicode.
+    """
+    return _smartypants_cache.get(_to_unicode(s), _smartypants)
+
+def urlencode(s):
+    """
+    URL encode a string as UTF-8 for a query string.
+    """
+    return _urlencode_cache.get(_to_unicode(s), lambda s: urllib.quote_plus(s.encode('utf-8')))
+
+def stats():
+    """
+    Hit and miss counts for each cache.
+    """
+    return {
+        'smartypants': { 'hits': _smartypants_cache.hits, 'misses': _smartypants_cache.misses, 'size': len(_smartypants_cache.entries) },
+        'urlencode': { 'hits': _urlencode_cache.hits, 'misses': _urlencode_cache.misses, 'size': len(_urlencode_cache.entries) }
+    }
+
+def print_stats():
+    """
+    Print a line of hit and miss counts per cache.
+    """
+    for name, counts in sorted(stats().items()):
+        print 'Typography cache %s: %i hits, %i misses, %i entries' % (name, counts['hits'], counts['misses'], counts['size'])
+
+def clear():
+    """
+    Empty every cache and reset its counters.
+    """
+    _smartypants_cache.clear()
+    _urlencode_cache.clear()
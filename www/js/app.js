@@ -68,6 +68,8 @@ var firstReviewerSong = false;
 var playExplicit = true;
 var reviewerDeepLink = false;
 var pausedTime = null;
+var SONG_DATA = [];
+var loadedShards = {};
 
 /*
  * Run on page load.
@@ -155,21 +157,53 @@ var onDocumentLoad = function(e) {
     });
 
     // set up the app
-    shuffleSongs();
-
     if (RESET_STATE) {
         resetState();
         resetLegalLimits();
     }
 
-    setupAudio();
-    loadState();
+    loadSongs(simpleStorage.get('songs15SelectedTag') || null, function() {
+        shuffleSongs();
+        setupAudio();
+        loadState();
+
+        setInterval(checkSkips, 60000);
+
+        hasher.initialized.add(onHashInit);
+        hasher.prependHash = '/';
+        hasher.init();
+    });
+}
+
+/*
+ * Load the songs for a tag, or all songs if the tag is null, then call
+ * callback. Songs are fetched one shard at a time as tags are picked, so
+ * SONG_DATA may only hold part of the catalog; totals come from
+ * SONG_INDEX. If a shard fails to load, callback still runs with the
+ * songs loaded so far.
+ */
+var loadSongs = function(tag, callback) {
+    var shard = tag === null ? SONG_INDEX['all'] : SONG_INDEX['tags'][tag];
+
+    if (!shard || loadedShards[shard['url']] || loadedShards[SONG_INDEX['all']['url']]) {
+        callback();
+        return;
+    }
+
+    $.getJSON(shard['url'], function(songs) {
+        var loadedIDs = _.indexBy(SONG_DATA, 'id');
 
-    setInterval(checkSkips, 60000);
+        for (var i = 0; i < songs.length; i++) {
+            if (!loadedIDs[songs[i]['id']]) {
+                SONG_DATA.push(songs[i]);
+            }
+        }
 
-    hasher.initialized.add(onHashInit);
-    hasher.prependHash = '/';
-    hasher.init();
+        loadedShards[shard['url']] = true;
+        callback();
+    }).fail(function() {
+        callback();
+    });
 }
 
 /*
@@ -193,6 +227,9 @@ var onHashInit = function(newHash, oldHash) {
             $('.go-wrapper a').html('Play ' + tag.displayname + ' <i class="fa fa-play"></i>').addClass('small');
             $instructions.find('b').text('We\'re currently playing ' + tag.displayname + ' Songs We Love.');
             ANALYTICS.trackEvent('playlist-deep-link', selectedTag);
+
+            // Fetch the playlist before the listener presses play
+            loadSongs(selectedTag, function() {});
         }
     }
 }
@@ -434,15 +471,12 @@ var checkSongHistory = function(song) {
 var setRemaining = function() {
     var songHistory = simpleStorage.get('songs15SongHistory');
     if (playExplicit) {
-        $songsRemaining.text(SONG_DATA.length - _.size(songHistory) + ' songs remaining');
+        $songsRemaining.text(Math.max(SONG_INDEX['all']['count'] - _.size(songHistory), 0) + ' songs remaining');
     } else {
         var cleanHistory = _.filter(songHistory, function(song) {
             return !song['explicit'];
         });
-        var cleanSongs = _.filter(SONG_DATA, function(song) {
-            return !song['explicit'];
-        });
-        $songsRemaining.text((cleanSongs.length - cleanHistory.length) + ' songs remaining');
+        $songsRemaining.text(Math.max(SONG_INDEX['all']['clean_count'] - cleanHistory.length, 0) + ' songs remaining');
 
     }
 }
@@ -618,12 +652,13 @@ var loadState = function() {
         }
     }
 
-    if (playedSongs.length === SONG_DATA.length) {
+    if (playedSongs.length >= SONG_INDEX['all']['count']) {
         playedSongs = [];
     }
 
     if (playedSongs.length > 0) {
-        buildListeningHistory();
+        // Played songs can come from any tag
+        loadSongs(null, buildListeningHistory);
         ANALYTICS.trackEvent('resumed-session');
     }
 
@@ -729,7 +764,7 @@ var shuffleSongs = function() {
  */
 var updatePlaylistLength = function() {
     $playlistLength.text(playlist.length);
-    $totalSongs.text(SONG_DATA.length);
+    $totalSongs.text(SONG_INDEX['all']['count']);
 }
 
 /*
@@ -801,13 +836,21 @@ var switchTag = function(tag, noAutoplay) {
     }
 
     updateTagDisplay();
-    shuffleSongs();
-    buildPlaylist();
-    preloadSongImages();
 
-    if (noAutoplay !== true) {
-        playIntroAudio();
-    }
+    loadSongs(tag, function() {
+        // Another tag may have been picked while this one loaded
+        if (selectedTag !== tag) {
+            return;
+        }
+
+        shuffleSongs();
+        buildPlaylist();
+        preloadSongImages();
+
+        if (noAutoplay !== true) {
+            playIntroAudio();
+        }
+    });
 
     ANALYTICS.trackEvent('switch-tag', selectedTag);
     ANALYTICS.trackEvent('switch-tag-songs', sessionSongsPlayed);
@@ -874,12 +917,15 @@ var updateTagDisplay = function() {
 var onShuffleSongsClick = function(e) {
     e.preventDefault();
 
-    shuffleSongs();
     resetState();
     toggleFilterPanel();
     updateTagDisplay();
-    buildPlaylist();
-    playIntroAudio();
+
+    loadSongs(null, function() {
+        shuffleSongs();
+        buildPlaylist();
+        playIntroAudio();
+    });
 }
 
 /*
@@ -958,21 +1004,23 @@ var swapTapeDeck = function() {
 var onGoButtonClick = function(e) {
     e.preventDefault();
 
-    if (reviewerDeepLink === true) {
-        buildPlaylist();
-        updateTagDisplay();
+    loadSongs(selectedTag, function() {
+        if (reviewerDeepLink === true) {
+            buildPlaylist();
+            updateTagDisplay();
+            swapTapeDeck();
+            playNextSong();
+            return;
+        }
+
         swapTapeDeck();
+        $songs.find('.song').remove();
+        playedSongs = [];
+        simpleStorage.set('songs15PlayedSongs', playedSongs);
+        switchTag(selectedTag, true);
         playNextSong();
-        return;
-    }
-
-    swapTapeDeck();
-    $songs.find('.song').remove();
-    playedSongs = [];
-    simpleStorage.set('songs15PlayedSongs', playedSongs);
-    switchTag(selectedTag, true);
-    playNextSong();
-    ANALYTICS.trackEvent('shuffle');
+        ANALYTICS.trackEvent('shuffle');
+    });
 }
 
 /*
@@ -1048,9 +1096,11 @@ var onContinueButtonClick = function(e) {
         return;
     }
 
-    buildPlaylist();
-    updateTagDisplay();
-    playNextSong();
+    loadSongs(selectedTag, function() {
+        buildPlaylist();
+        updateTagDisplay();
+        playNextSong();
+    });
 
     ANALYTICS.trackEvent('continue-playback-click');
 }